@@ -0,0 +1,99 @@
+"""
+Compares the sequential and the reconciled tree builders.
+
+`ProcessTree.build_tree_from_arrow` inserts the rows one by one, in event order;
+`ProcessTree.build_tree_reconciled` resolves every process in one batch and doesn't
+depend on the order of the rows. Both are timed on the demo data and on synthetic
+MDE events with reused process ids and late events (see
+process_tree_widget.synthetic):
+
+    python benchmarks/reconcile.py --sizes 1e4 1e5 --pid-reuse 0.3
+
+Each input is checked to give the same nodes, parents and filenames both ways, and
+the reconciled build to give the same tree for the rows in reverse order.
+"""
+
+import argparse
+import json
+import pathlib
+import time
+
+from typing import Any, Dict, List, Tuple
+
+import ibis
+import pyarrow as pa
+
+from process_tree_widget.synthetic import generate_events
+from process_tree_widget.tree import ProcessTree
+from process_tree_widget.utils import prepare_events
+
+DEMO: pathlib.Path = pathlib.Path(__file__).parent.parent / "public" / "demo.parquet"
+
+
+def _shape(tree: ProcessTree) -> Dict[str, Tuple[Tuple[str, ...], Any]]:
+    # Node -> parents and filename, leaving out the node order
+    return {
+        node["_name"]: (tuple(node["_deps"]), node.get("ProcessName"))
+        for node in tree.create_dependentree_format()
+    }
+
+
+def run(name: str, table: pa.Table, repeat: int) -> List[Dict[str, Any]]:
+    results, trees = [], {}
+    for reconcile in (False, True):
+        seconds = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            trees[reconcile] = ProcessTree.from_arrow(table, reconcile)
+            seconds.append(time.perf_counter() - start)
+        method = "reconciled" if reconcile else "sequential"
+        results.append(
+            {"input": name, "rows": table.num_rows, "method": method, "seconds": min(seconds)}
+        )
+
+    expected = _shape(trees[False])
+    if _shape(trees[True]) != expected:
+        differing = [
+            node
+            for node, value in _shape(trees[True]).items()
+            if expected.get(node) != value
+        ]
+        raise AssertionError(f"Builders disagree on {name} for {differing[:5]}")
+    reversed_rows = table.take(pa.array(range(table.num_rows - 1, -1, -1)))
+    if _shape(ProcessTree.from_arrow(reversed_rows, reconcile=True)) != expected:
+        raise AssertionError(f"Reconciled build of {name} depends on the row order")
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", nargs="+", type=float, default=[1e4, 1e5])
+    parser.add_argument("--pid-reuse", type=float, default=0.3)
+    parser.add_argument("--out-of-order", type=float, default=0.3)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--json", type=pathlib.Path, default=None)
+    args = parser.parse_args()
+
+    inputs = {"demo": prepare_events(ibis.read_parquet(DEMO), "mde").to_pyarrow()}
+    for size in args.sizes:
+        events = generate_events(
+            "mde", int(size), pid_reuse=args.pid_reuse, out_of_order=args.out_of_order
+        )
+        inputs[f"mde-{int(size)}"] = prepare_events(ibis.memtable(events), "mde").to_pyarrow()
+
+    print(f"{'input':<12}{'rows':>11}  {'method':<12}{'seconds':>10}")
+    results = []
+    for name, table in inputs.items():
+        for result in run(name, table, args.repeat):
+            print(
+                f"{result['input']:<12}{result['rows']:>11,}  "
+                f"{result['method']:<12}{result['seconds']:>10.3f}"
+            )
+            results.append(result)
+
+    if args.json:
+        args.json.write_text(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
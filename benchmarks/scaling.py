@@ -0,0 +1,211 @@
+"""
+Measures how each stage of building the widget scales with the number of events.
+
+Generates synthetic MDE and Volatility tables (see process_tree_widget.synthetic) and
+records wall time and peak memory for every stage, from `prepare_events` to the state
+the widget sends to the frontend:
+
+    python benchmarks/scaling.py --sizes 1e3 1e4 1e5 --json /tmp/scaling.json
+
+Peak memory is the growth of the process's peak RSS during the stage, which covers
+both Python objects and Arrow buffers (Linux only). With --tracemalloc the peak of
+the Python heap is recorded as well, in a second run so it doesn't skew the timings.
+
+The tree_memory stage records `ProcessTree.memory_usage` of the built tree, including
+how much the shared filename dictionary saves over one filename string per node.
+"""
+
+import argparse
+import gc
+import json
+import pathlib
+import time
+import tracemalloc
+
+from datetime import datetime
+from typing import Any, Callable, Dict, List
+
+import ibis
+from ipywidgets.widgets.widget import _remove_buffers
+
+from process_tree_widget import ProcessTreeWidget
+from process_tree_widget.synthetic import generate_events
+from process_tree_widget.tree import ProcessTree
+from process_tree_widget.utils import prepare_events
+
+STATUS = pathlib.Path("/proc/self/status")
+CLEAR_REFS = pathlib.Path("/proc/self/clear_refs")
+
+
+def _rss(field: str) -> int | None:
+    try:
+        for line in STATUS.read_text().splitlines():
+            if line.startswith(field):
+                return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+def _reset_peak_rss() -> None:
+    try:
+        # Resets VmHWM to the current RSS
+        CLEAR_REFS.write_text("5")
+    except OSError:
+        pass
+
+
+def _json_default(value: Any) -> str:
+    # What the kernel does with datetimes in comm messages
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _widget_state(widget: ProcessTreeWidget) -> int:
+    """Serializes the synced state like a comm `update` message; returns its size."""
+    state = widget.get_state()
+    state, _, buffers = _remove_buffers(state)
+    return len(json.dumps(state, default=_json_default)) + sum(
+        memoryview(buffer).nbytes for buffer in buffers
+    )
+
+
+# Stage name -> function of the results so far; each stage's return value is kept
+# under its name for the stages after it
+STAGES: Dict[str, Callable[[Dict[str, Any]], Any]] = {
+    "prepare_events": lambda ctx: prepare_events(
+        ibis.memtable(ctx["events"]), ctx["source"]
+    ).to_pyarrow(),
+    "to_pylist": lambda ctx: ctx["prepare_events"].to_pylist(),
+    "build_tree": lambda ctx: ProcessTree(ctx["to_pylist"]),
+    "from_arrow": lambda ctx: ProcessTree.from_arrow(ctx["prepare_events"]),
+    "tree_memory": lambda ctx: ctx["from_arrow"].memory_usage(),
+    "dependentree": lambda ctx: ctx["from_arrow"].create_dependentree_format(),
+    "widget_json": lambda ctx: ProcessTreeWidget(
+        ibis.memtable(ctx["events"]), source=ctx["source"]
+    ),
+    "serialize_json": lambda ctx: _widget_state(ctx["widget_json"]),
+    "widget_binary": lambda ctx: ProcessTreeWidget(
+        ibis.memtable(ctx["events"]), source=ctx["source"], transport="binary"
+    ),
+    "serialize_binary": lambda ctx: _widget_state(ctx["widget_binary"]),
+}
+
+
+def run(
+    source: str,
+    rows: int,
+    stages: List[str],
+    generator: Dict[str, Any],
+    trace: bool,
+) -> List[Dict[str, Any]]:
+    ctx: Dict[str, Any] = {
+        "source": source,
+        "events": generate_events(source, rows, **generator),
+    }
+    results = []
+    for name in stages:
+        gc.collect()
+        if trace:
+            tracemalloc.start()
+        _reset_peak_rss()
+        rss = _rss("VmRSS:")
+
+        start = time.perf_counter()
+        ctx[name] = STAGES[name](ctx)
+        seconds = time.perf_counter() - start
+
+        peak = _rss("VmHWM:")
+        result = {
+            "source": source,
+            "rows": rows,
+            "stage": name,
+            "seconds": seconds,
+            "peak_rss": None if peak is None or rss is None else peak - rss,
+        }
+        if trace:
+            result["python_peak"] = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+        if name == "tree_memory":
+            result["memory_usage"] = ctx[name]
+        results.append(result)
+    return results
+
+
+def _megabytes(value: int | None) -> str:
+    return "n/a" if value is None else f"{value / 2**20:.1f}"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", nargs="+", type=float, default=[1e3, 1e4, 1e5])
+    parser.add_argument(
+        "--sources", nargs="+", choices=["mde", "volatility"], default=["mde", "volatility"]
+    )
+    parser.add_argument("--stages", nargs="+", choices=list(STAGES), default=list(STAGES))
+    parser.add_argument(
+        "--max-row-path",
+        type=float,
+        default=1e6,
+        help="skip to_pylist/build_tree above this many rows",
+    )
+    parser.add_argument("--fanout", type=int, default=4)
+    parser.add_argument("--depth", type=int, default=6)
+    parser.add_argument("--pid-reuse", type=float, default=0.0)
+    parser.add_argument("--out-of-order", type=float, default=0.0)
+    parser.add_argument("--tracemalloc", action="store_true")
+    parser.add_argument("--json", type=pathlib.Path, default=None)
+    args = parser.parse_args()
+
+    generator = {
+        "fanout": args.fanout,
+        "depth": args.depth,
+        "pid_reuse": args.pid_reuse,
+        "out_of_order": args.out_of_order,
+    }
+
+    print(f"{'source':<11}{'rows':>11}  {'stage':<17}{'seconds':>10}{'peak MB':>10}")
+    results = []
+    for source in args.sources:
+        for size in args.sizes:
+            rows = int(size)
+            stages = [
+                stage
+                for stage in args.stages
+                if rows <= args.max_row_path or stage not in ("to_pylist", "build_tree")
+            ]
+            timed = run(source, rows, stages, generator, trace=False)
+            if args.tracemalloc:
+                traced = run(source, rows, stages, generator, trace=True)
+                for result, trace in zip(timed, traced):
+                    result["python_peak"] = trace["python_peak"]
+
+            for result in timed:
+                print(
+                    f"{source:<11}{rows:>11,}  {result['stage']:<17}"
+                    f"{result['seconds']:>10.3f}{_megabytes(result['peak_rss']):>10}"
+                    + (
+                        f"  (python {_megabytes(result['python_peak'])} MB)"
+                        if "python_peak" in result
+                        else ""
+                    )
+                )
+                if "memory_usage" in result:
+                    usage = result["memory_usage"]
+                    print(
+                        f"{'':<24}total {_megabytes(usage['total'])} MB: "
+                        + ", ".join(
+                            f"{part} {_megabytes(usage[part])}"
+                            for part in ("nodes", "filenames", "keys", "indexes")
+                        )
+                        + f"; one filename per node {_megabytes(usage['filenames_per_node'])}"
+                    )
+            results.extend(timed)
+
+    if args.json:
+        args.json.write_text(json.dumps({"generator": generator, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Compares the JSON `events` transport with the binary `_columns` transport.
+
+Builds a tree from the bundled sample data (replicated to reach the requested size),
+reports payload bytes and Python-side encode time for both, and writes the payloads
+to --out so `transport_decode.mjs` can time the browser-side decode:
+
+    python benchmarks/transport.py --copies 1000 --out /tmp/transport
+    node benchmarks/transport_decode.mjs /tmp/transport
+"""
+
+import argparse
+import json
+import pathlib
+import time
+
+import ibis
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from process_tree_widget.transport import encode_columns, split_buffers
+from process_tree_widget.tree import ProcessTree
+from process_tree_widget.utils import prepare_events
+
+ROOT = pathlib.Path(__file__).parent.parent
+
+
+def replicated_events(copies: int) -> pa.Table:
+    """The demo MDE events, repeated with shifted process ids so the copies don't merge."""
+    base = prepare_events(ibis.read_parquet(ROOT / "public" / "demo.parquet"), "mde")
+    base = base.to_pyarrow()
+
+    parts = []
+    for copy in range(copies):
+        part = base
+        for name in ("TargetProcessId", "ActingProcessId", "ParentProcessId"):
+            column = pc.cast(part[name], pa.int64())
+            shifted = pc.if_else(pc.equal(column, -1), column, pc.add(column, copy * 100_000))
+            part = part.set_column(part.schema.get_field_index(name), name, shifted)
+        parts.append(part)
+    return pa.concat_tables(parts)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--copies", type=int, default=100)
+    parser.add_argument("--out", type=pathlib.Path, default=None)
+    args = parser.parse_args()
+
+    tree = ProcessTree.from_arrow(replicated_events(args.copies))
+
+    start = time.perf_counter()
+    events_json = json.dumps(tree.create_dependentree_format(), default=str)
+    json_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    content, buffers = split_buffers(encode_columns(tree))
+    content_json = json.dumps(content)
+    binary_seconds = time.perf_counter() - start
+
+    json_bytes = len(events_json.encode())
+    binary_bytes = len(content_json.encode()) + sum(b.nbytes for b in buffers)
+
+    print(f"nodes:  {len(tree):>12,}")
+    print(f"json:   {json_bytes:>12,} bytes  encode {json_seconds * 1000:8.1f} ms")
+    print(f"binary: {binary_bytes:>12,} bytes  encode {binary_seconds * 1000:8.1f} ms")
+    print(f"ratio:  {json_bytes / binary_bytes:>12.1f}x")
+
+    if args.out:
+        args.out.mkdir(parents=True, exist_ok=True)
+        (args.out / "events.json").write_text(events_json)
+        (args.out / "columns.json").write_text(content_json)
+        with open(args.out / "columns.bin", "wb") as f:
+            for buffer in buffers:
+                f.write(buffer)
+
+
+if __name__ == "__main__":
+    main()
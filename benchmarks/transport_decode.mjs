@@ -0,0 +1,40 @@
+// Times the browser-side decode of the payloads written by transport.py.
+//
+//     node benchmarks/transport_decode.mjs /tmp/transport
+
+import { readFileSync } from "node:fs";
+import { join } from "node:path";
+import { ColumnarEvents } from "../js/columns.js";
+
+const dir = process.argv[2];
+
+function time(label, fn, repeat = 5) {
+	let best = Infinity;
+	let result;
+	for (let i = 0; i < repeat; i++) {
+		const start = performance.now();
+		result = fn();
+		best = Math.min(best, performance.now() - start);
+	}
+	console.log(`${label.padEnd(32)} ${best.toFixed(1).padStart(8)} ms`);
+	return result;
+}
+
+const eventsText = readFileSync(join(dir, "events.json"), "utf8");
+const content = JSON.parse(readFileSync(join(dir, "columns.json"), "utf8"));
+const binary = readFileSync(join(dir, "columns.bin"));
+
+// Rebuild the DataViews anywidget would hand to the widget
+const payload = { ...content };
+let offset = 0;
+for (const name of content.buffers) {
+	const bytes = { parent: 4, filename: 4, pid: 8, time: 8 }[name] * content.length;
+	payload[name] = new DataView(binary.buffer, binary.byteOffset + offset, bytes);
+	offset += bytes;
+}
+
+const events = time("json: JSON.parse", () => JSON.parse(eventsText));
+const columns = time("binary: decode", () => new ColumnarEvents(payload));
+time("binary: 1k entities", () => columns.entities(Array.from({ length: 1000 }, (_, i) => i)));
+time("binary: all entities", () => columns.entities());
+console.log(`nodes: ${events.length}`);
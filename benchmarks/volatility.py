@@ -0,0 +1,88 @@
+"""
+Compares the two ways of preparing Volatility `windows.pstree` output.
+
+`utils.prepare_volatility_data` resolves parents and grandparents with two self-joins
+in the ibis backend; `arrow.prepare_volatility_table` looks them up in one pass over
+an Arrow table. Both are timed on synthetic tables (see
+process_tree_widget.synthetic), optionally spread over several memory images:
+
+    python benchmarks/volatility.py --sizes 1e4 1e5 1e6 --images 1 10
+
+The ibis timing includes fetching the result with `to_pyarrow`, the Arrow timing
+starts from the raw table, as the widget does after fetching it. Each size is
+checked to give the same rows both ways.
+"""
+
+import argparse
+import json
+import pathlib
+import time
+
+from typing import Any, Callable, Dict, List
+
+import ibis
+import pyarrow as pa
+
+from process_tree_widget.arrow import PROCESS_COLUMNS, prepare_volatility_table
+from process_tree_widget.synthetic import generate_volatility_events
+from process_tree_widget.utils import prepare_volatility_data
+
+METHODS: Dict[str, Callable[[pa.Table, str | None], pa.Table]] = {
+    "ibis_joins": lambda table, image: prepare_volatility_data(
+        ibis.memtable(table), image
+    ).to_pyarrow(),
+    "arrow_lookup": prepare_volatility_table,
+}
+
+
+def _rows(table: pa.Table, image: str | None) -> List[str]:
+    columns = ([image] if image else []) + list(PROCESS_COLUMNS)
+    return sorted(map(repr, table.select(columns).to_pylist()))
+
+
+def run(rows: int, images: int, repeat: int) -> List[Dict[str, Any]]:
+    table = generate_volatility_events(rows, images=images, out_of_order=0.1)
+    image = "ImageId" if images > 1 else None
+
+    results, outputs = [], {}
+    for name, method in METHODS.items():
+        seconds = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            outputs[name] = method(table, image)
+            seconds.append(time.perf_counter() - start)
+        results.append(
+            {"rows": rows, "images": images, "method": name, "seconds": min(seconds)}
+        )
+
+    expected, *others = (_rows(output, image) for output in outputs.values())
+    if any(other != expected for other in others):
+        raise AssertionError(f"Methods disagree for {rows} rows over {images} images")
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", nargs="+", type=float, default=[1e4, 1e5])
+    parser.add_argument("--images", nargs="+", type=int, default=[1, 10])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--json", type=pathlib.Path, default=None)
+    args = parser.parse_args()
+
+    print(f"{'rows':>11}{'images':>8}  {'method':<14}{'seconds':>10}")
+    results = []
+    for size in args.sizes:
+        for images in args.images:
+            for result in run(int(size), images, args.repeat):
+                print(
+                    f"{result['rows']:>11,}{result['images']:>8}  "
+                    f"{result['method']:<14}{result['seconds']:>10.3f}"
+                )
+                results.append(result)
+
+    if args.json:
+        args.json.write_text(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
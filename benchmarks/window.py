@@ -0,0 +1,126 @@
+"""
+Times the server-side time window of a ProcessTree and of a ProcessForest.
+
+`ProcessTree.filter_time_window` selects the nodes created in a window plus the
+earlier nodes with children, from the time index, and `create_dependentree_format`
+encodes them for the frontend. Both are timed for a few windows on the demo data and
+on synthetic MDE events spread over several devices (see
+process_tree_widget.synthetic), built once as one tree and once partitioned by
+`DeviceName`:
+
+    python benchmarks/window.py --sizes 1e4 1e5 --devices 10
+
+Every window is checked to be closed under `_deps`: each parent the frontend is sent
+is in the window too, the partition roots of a forest included.
+"""
+
+import argparse
+import json
+import pathlib
+import time
+
+from datetime import datetime
+from typing import Any, Dict, List
+
+import ibis
+import pyarrow as pa
+
+from process_tree_widget.forest import ProcessForest
+from process_tree_widget.synthetic import generate_events
+from process_tree_widget.tree import ProcessTree
+from process_tree_widget.utils import prepare_events
+
+DEMO: pathlib.Path = pathlib.Path(__file__).parent.parent / "public" / "demo.parquet"
+
+# Windows as fractions of the time span of the tree
+WINDOWS: Dict[str, tuple] = {
+    "first-half": (0.0, 0.5),
+    "middle": (0.25, 0.75),
+    "last-half": (0.5, 1.0),
+    "last-tenth": (0.9, 1.0),
+}
+
+
+def _window(tree: ProcessTree, lo: float, hi: float) -> tuple:
+    first, last = tree.get_first_and_last_processes()
+    start = first.target_process_creation_time
+    span = last.target_process_creation_time - start
+    return start + span * lo, start + span * hi
+
+
+def check_closed(name: str, events: List[Dict[str, Any]]) -> None:
+    """Raises if an entry's parent is not among the entries."""
+    names = {entry["_name"] for entry in events}
+    dangling = [
+        entry["_name"]
+        for entry in events
+        if any(parent not in names for parent in entry["_deps"])
+    ]
+    if dangling:
+        raise AssertionError(f"Parents missing from {name} for {dangling[:5]}")
+
+
+def run(name: str, table: pa.Table, repeat: int) -> List[Dict[str, Any]]:
+    trees = {
+        "tree": ProcessTree.from_arrow(table),
+        "forest": ProcessForest.from_arrow(table, "DeviceName", max_workers=1),
+    }
+    results = []
+    for kind, tree in trees.items():
+        for window, (lo, hi) in WINDOWS.items():
+            start, end = _window(tree, lo, hi)
+            seconds = {"filter": [], "encode": []}
+            for _ in range(repeat):
+                began = time.perf_counter()
+                indices = tree.filter_time_window(start, end)
+                filtered = time.perf_counter()
+                events = tree.create_dependentree_format(indices=indices)
+                seconds["filter"].append(filtered - began)
+                seconds["encode"].append(time.perf_counter() - filtered)
+            check_closed(f"{name} {kind} {window}", events)
+            results.append(
+                {
+                    "input": name,
+                    "rows": table.num_rows,
+                    "tree": kind,
+                    "window": window,
+                    "nodes": len(indices),
+                    **{stage: min(values) for stage, values in seconds.items()},
+                }
+            )
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", nargs="+", type=float, default=[1e4, 1e5])
+    parser.add_argument("--devices", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--json", type=pathlib.Path, default=None)
+    args = parser.parse_args()
+
+    inputs = {"demo": prepare_events(ibis.read_parquet(DEMO), "mde").to_pyarrow()}
+    for size in args.sizes:
+        events = generate_events("mde", int(size), devices=args.devices)
+        inputs[f"mde-{int(size)}"] = prepare_events(ibis.memtable(events), "mde").to_pyarrow()
+
+    print(
+        f"{'input':<12}{'rows':>11}  {'tree':<8}{'window':<12}"
+        f"{'nodes':>9}{'filter':>10}{'encode':>10}"
+    )
+    results = []
+    for name, table in inputs.items():
+        for result in run(name, table, args.repeat):
+            print(
+                f"{result['input']:<12}{result['rows']:>11,}  {result['tree']:<8}"
+                f"{result['window']:<12}{result['nodes']:>9,}"
+                f"{result['filter']:>10.4f}{result['encode']:>10.3f}"
+            )
+            results.append(result)
+
+    if args.json:
+        args.json.write_text(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
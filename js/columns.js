@@ -0,0 +1,196 @@
+// Decoding of the binary `_columns` transport (see transport.encode_columns).
+//
+// The tree arrives as a handful of typed arrays plus a string table. Nodes stay in
+// those arrays; dependentree entities are only built for the nodes that are rendered.
+
+const COLUMN_TYPES = {
+	parent: Int32Array,
+	pid: Float64Array,
+	time: Float64Array,
+	filename: Int32Array,
+	index: Int32Array,
+	child_count: Int32Array,
+};
+
+function typedArray(Type, view) {
+	if (view.byteOffset % Type.BYTES_PER_ELEMENT === 0) {
+		return new Type(view.buffer, view.byteOffset, view.byteLength / Type.BYTES_PER_ELEMENT);
+	}
+	// Unaligned slice of a larger message buffer, copy it
+	return new Type(view.buffer.slice(view.byteOffset, view.byteOffset + view.byteLength));
+}
+
+function decodeColumns(payload, buffers) {
+	const view = (name) => (buffers ? buffers[payload.buffers.indexOf(name)] : payload[name]);
+	const columns = {};
+	for (const [name, Type] of Object.entries(COLUMN_TYPES)) {
+		if (view(name)) columns[name] = typedArray(Type, view(name));
+	}
+	// Numeric node attributes, NaN where a node has none
+	columns.attributes = {};
+	for (const name of payload.attributes ?? []) {
+		columns.attributes[name] = typedArray(Float64Array, view(`attr:${name}`));
+	}
+	return columns;
+}
+
+function grow(column, capacity) {
+	const grown = new column.constructor(capacity);
+	grown.set(column);
+	return grown;
+}
+
+export class ColumnarEvents {
+	constructor(payload) {
+		const columns = decodeColumns(payload);
+		// `length` is the size of the whole tree, a subset is as long as its index
+		this.length = columns.index ? columns.index.length : payload.length;
+		this.placeholderRoot = payload.placeholder_root;
+		this.names = payload.names.slice();
+		this.parent = columns.parent;
+		this.pid = columns.pid;
+		this.time = columns.time;
+		this.filename = columns.filename;
+		// Node index per position, when the payload is a subset of the tree
+		this.index = columns.index ?? null;
+		// Children still to be loaded, for lazy loading
+		this.childCount = columns.child_count ?? null;
+		this.attributes = columns.attributes;
+		this._positions = null;
+		this._hasChildren = null;
+	}
+
+	// Build the dependentree entity for one node
+	entity(i) {
+		const node = this.index ? this.index[i] : i;
+		if (node === 0 && this.placeholderRoot) {
+			return { _name: "0", _deps: [] };
+		}
+		const parent = this.parent[i];
+		const time = this.time[i];
+		const entity = {
+			_name: String(node),
+			_deps: parent >= 0 ? [String(parent)] : [],
+			ProcessName: this.names[this.filename[i]],
+			ProcessId: this.pid[i],
+			ProcessCreationTime: Number.isNaN(time) ? undefined : new Date(time).toISOString(),
+		};
+		if (this.childCount) entity._child_count = this.childCount[i];
+		for (const [name, values] of Object.entries(this.attributes)) {
+			if (!Number.isNaN(values[i])) entity[name] = values[i];
+		}
+		return entity;
+	}
+
+	entities(indices) {
+		if (!indices) indices = Array.from({ length: this.length }, (_, i) => i);
+		return Array.from(indices, (i) => this.entity(i));
+	}
+
+	hasChildren() {
+		if (!this._hasChildren) {
+			const flags = new Uint8Array(this.length);
+			for (let i = 0; i < this.length; i++) {
+				if (this.parent[i] >= 0) flags[this.parent[i]] = 1;
+			}
+			this._hasChildren = flags;
+		}
+		return this._hasChildren;
+	}
+
+	// Creation times as Dates, for the time filter histogram
+	dates() {
+		const dates = [];
+		for (let i = 0; i < this.length; i++) {
+			if (!Number.isNaN(this.time[i])) dates.push(new Date(this.time[i]));
+		}
+		return dates;
+	}
+
+	// Position of each node, when the payload is a subset of the tree
+	positions() {
+		if (!this._positions) {
+			this._positions = new Map();
+			for (let i = 0; i < this.length; i++) this._positions.set(this.index[i], i);
+		}
+		return this._positions;
+	}
+
+	// Apply a delta sent by `append_events` or in answer to an expand request
+	// (see split_buffers)
+	applyDelta(payload, buffers) {
+		const columns = decodeColumns(payload, buffers);
+
+		// A full payload is laid out by node index, a subset is appended to
+		const positions = this.index ? this.positions() : null;
+		let length = this.index ? this.length : payload.length;
+		const targets = Array.from(columns.index, (node) => {
+			if (!positions) return node;
+			if (!positions.has(node)) positions.set(node, length++);
+			return positions.get(node);
+		});
+
+		if (length > this.parent.length) {
+			const capacity = Math.max(length, 2 * this.parent.length);
+			this.parent = grow(this.parent, capacity);
+			this.pid = grow(this.pid, capacity);
+			this.time = grow(this.time, capacity);
+			this.filename = grow(this.filename, capacity);
+			if (this.index) this.index = grow(this.index, capacity);
+			if (this.childCount) this.childCount = grow(this.childCount, capacity);
+			for (const [name, values] of Object.entries(this.attributes)) {
+				this.attributes[name] = grow(values, capacity);
+			}
+		}
+		for (const name of Object.keys(columns.attributes)) {
+			if (!this.attributes[name]) {
+				// First sent with this delta
+				this.attributes[name] = new Float64Array(this.parent.length).fill(NaN);
+			}
+		}
+
+		targets.forEach((i, k) => {
+			this.parent[i] = columns.parent[k];
+			this.pid[i] = columns.pid[k];
+			this.time[i] = columns.time[k];
+			this.filename[i] = columns.filename[k];
+			if (this.index) this.index[i] = columns.index[k];
+			if (this.childCount) this.childCount[i] = columns.child_count?.[k] ?? 0;
+			for (const [name, values] of Object.entries(this.attributes)) {
+				values[i] = columns.attributes[name]?.[k] ?? NaN;
+			}
+		});
+
+		this.names.splice(payload.names_offset, Infinity, ...payload.names);
+		this.length = length;
+		this._hasChildren = null;
+		return this;
+	}
+}
+
+// Columnar version of filterAndSortData: returns the node indices to render.
+export function filterAndSortIndices(columns, startDate, endDate) {
+	const start = startDate ? new Date(startDate).getTime() : null;
+	const end = endDate ? new Date(endDate).getTime() : null;
+	const hasChildren = columns.hasChildren();
+	const time = columns.time;
+
+	const indices = [];
+	for (let i = 0; i < columns.length; i++) {
+		const t = time[i];
+		if (Number.isNaN(t) || (start === null && end === null)) {
+			indices.push(i);
+			continue;
+		}
+		const isBeforeStartDate = start !== null ? t < start : false;
+		if ((hasChildren[i] && isBeforeStartDate) || (t >= start && t <= end)) {
+			indices.push(i);
+		}
+	}
+
+	return indices.sort((a, b) => {
+		if (Number.isNaN(time[a])) return -1;
+		if (Number.isNaN(time[b])) return 1;
+		return time[a] - time[b];
+	});
+}
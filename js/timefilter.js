@@ -1,9 +1,41 @@
 import * as d3 from "d3";
 import * as Plot from "@observablehq/plot";
+import { parseTime } from "./utils.js";
 
 
-// Time-based bar chart showing process counts with proper date handling
-export function timeProcessBarplot(data, { width = 400, height = 200, startDate, endDate, setDateRange, resetDateRange }) {
+const BINS = 20;
+
+// Re-bin the histograms from transport.encode_histograms into about BINS bars, using
+// the coarsest resolution that is still fine enough. Costs O(buckets), not O(nodes).
+export function binHistogram({ resolutions }, bins = BINS) {
+    const finest = resolutions[0];
+    if (!finest || !finest.start.length) return [];
+    const first = finest.start[0];
+    const last = finest.start[finest.start.length - 1] + finest.width;
+    const target = (last - first) / bins;
+
+    let resolution = finest;
+    for (const candidate of resolutions) {
+        if (candidate.width <= target) resolution = candidate;
+    }
+    const width = Math.max(resolution.width, Math.ceil(target / resolution.width) * resolution.width);
+    const origin = resolution.start[0];
+
+    const counts = new Map();
+    resolution.start.forEach((start, i) => {
+        const bin = Math.floor((start - origin) / width);
+        counts.set(bin, (counts.get(bin) ?? 0) + resolution.count[i]);
+    });
+    return Array.from(counts, ([bin, count]) => ({
+        x1: new Date(origin + bin * width),
+        x2: new Date(origin + (bin + 1) * width),
+        count,
+    }));
+}
+
+// Time-based bar chart showing process counts with proper date handling. With a
+// `histogram` (see binHistogram) `data` is ignored and nothing is binned per node.
+export function timeProcessBarplot(data, { width = 400, height = 200, startDate, endDate, setDateRange, resetDateRange, x = d => parseTime(d.ProcessCreationTime), histogram = null }) {
     const defaultDimensions = { width: 400, height: 200 };
     const chartWidth = width || defaultDimensions.width;
     const chartHeight = height || defaultDimensions.height;
@@ -26,17 +58,25 @@ export function timeProcessBarplot(data, { width = 400, height = 200, startDate,
         },
         marks: [
             Plot.ruleY([0]),
-            Plot.rectY(data,
-                Plot.binX(
-                    { y: "count" },
-                    {
-                        x: d => new Date(d.ProcessCreationTime),
-                        fill: "#6b7280",
-                        tip: true,
-                        thresholds: 20
-                    }
-                )
-            ),
+            histogram
+                ? Plot.rectY(binHistogram(histogram), {
+                    x1: "x1",
+                    x2: "x2",
+                    y: "count",
+                    fill: "#6b7280",
+                    tip: true
+                })
+                : Plot.rectY(data,
+                    Plot.binX(
+                        { y: "count" },
+                        {
+                            x,
+                            fill: "#6b7280",
+                            tip: true,
+                            thresholds: BINS
+                        }
+                    )
+                ),
             (index, scales, channels, dimensions, context) => {
                 const x1 = dimensions.marginLeft;
                 const y1 = 0;
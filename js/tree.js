@@ -15,6 +15,8 @@ export class ProcessTree {
         this.tree = null;
         this.data = null;
         this.zoom = null;
+        // Names to expand on the next initialize, e.g. after their children were loaded
+        this.pendingExpand = new Set();
 
         this.options = {
             containerWidthMultiplier: 0.75,
@@ -24,6 +26,7 @@ export class ProcessTree {
             textStyleColor: "var(--marimo-text-color, #ededed)",
             modifyEntityName: ({ ProcessName }) => ProcessName,
             contextMenuClick: null,
+            loadChildren: null, // called with an entity whose children are not loaded yet
             selectedNodeStrokeColor: "var(--marimo-selected-node-stroke-color, #37353f)",
             selectedNodeColor: "var(--marimo-selected-node-color, #37353f)",
             selectedNodeStrokeWidth: 1.5,
@@ -61,7 +64,8 @@ export class ProcessTree {
         let selectedNode = data.find(d => d.ProcessId === process_id);
         this.currentNode = this.currentNode ? this.currentNode : data[0]?._name;
 
-        const expandedNodes = new Set();
+        const expandedNodes = new Set(this.pendingExpand);
+        this.pendingExpand.clear();
         if (this.tree) {
             const collectExpandedNodes = (node) => {
                 if (node.children) {
@@ -153,7 +157,11 @@ export class ProcessTree {
             .style('padding', '8px 12px')
             .style('cursor', 'pointer')
             .on('click', () => {
-                this.tree.expandNode(d);
+                if (d.data._child_count > 0 && this.options.loadChildren) {
+                    this.options.loadChildren(d.data);
+                } else {
+                    this.tree.expandNode(d);
+                }
                 this.tree.svg.selectAll('.context-menu').remove();
             });
 
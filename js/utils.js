@@ -12,6 +12,14 @@ export function getCurrentNodePid(data, currentNode) {
 	return undefined;
 }
 
+// Creation times are serialized without a zone; they are UTC, like the time filter axis.
+export function parseTime(value) {
+	if (typeof value === "string" && !/(Z|[+-]\d\d:?\d\d)$/.test(value)) {
+		return new Date(value + "Z");
+	}
+	return new Date(value);
+}
+
 export function filterAndSortData(data, startDate, endDate) {
 	// TODO: add helper findClosestAncestorInFiltered(allEvents, filteredEvents, startNode)
 	// that walks parent chain (_deps[0]) until it finds an event inside filteredEvents.
@@ -20,19 +28,45 @@ export function filterAndSortData(data, startDate, endDate) {
 	const start = startDate ? new Date(startDate) : null;
 	const end = endDate ? new Date(endDate) : null;
 
+	// Names that appear as someone's parent, computed once instead of per event
+	const parents = start || end ? new Set(data.flatMap(d => d._deps ?? [])) : null;
+
 	return data
 		.filter(d => {
 			if (d.ProcessCreationTime === undefined) return true; // keep if no time metadata
 			if (!start && !end) return true; // no filtering applied
 
-			const date = new Date(d.ProcessCreationTime);
-			const hasChildren = data.some(child => child._deps?.includes(d._name));
+			const date = parseTime(d.ProcessCreationTime);
+			const hasChildren = parents.has(d._name);
 			const isBeforeStartDate = start ? date < start : false;
 			return (hasChildren && isBeforeStartDate) || (date >= start && date <= end);
 		})
 		.sort((a, b) => {
 			if (!a.ProcessCreationTime) return -1;
 			if (!b.ProcessCreationTime) return 1;
-			return new Date(a.ProcessCreationTime) - new Date(b.ProcessCreationTime);
+			return parseTime(a.ProcessCreationTime) - parseTime(b.ProcessCreationTime);
 		});
 }
+
+const eventPositions = new WeakMap();
+
+// Patch a delta from `append_events` into the events array in place.
+// Entries are matched on `_name`; unknown names are appended.
+export function applyEventsDelta(events, delta) {
+	let positions = eventPositions.get(events);
+	if (!positions) {
+		positions = new Map(events.map((d, i) => [d._name, i]));
+		eventPositions.set(events, positions);
+	}
+
+	for (const entry of delta) {
+		const position = positions.get(entry._name);
+		if (position === undefined) {
+			positions.set(entry._name, events.length);
+			events.push(entry);
+		} else {
+			events[position] = entry;
+		}
+	}
+	return events;
+}
@@ -1,10 +1,30 @@
-import { getCurrentNodePid, filterAndSortData } from "./utils.js";
+import { getCurrentNodePid, filterAndSortData, applyEventsDelta } from "./utils.js";
 import { ProcessTree } from "./tree.js";
 import { html } from "htl";
 import { timeProcessBarplot } from "./timefilter.js"
+import { ColumnarEvents, filterAndSortIndices } from "./columns.js";
+
+const decodedColumns = new WeakMap();
+
+// Decoded `_columns` payload of the binary transport, or null for the JSON transport
+function getColumns(model) {
+	const payload = model.get("_columns");
+	if (!payload) return null;
+	let columns = decodedColumns.get(payload);
+	if (!columns) {
+		columns = new ColumnarEvents(payload);
+		decodedColumns.set(payload, columns);
+	}
+	return columns;
+}
 
 function createTimeProcessBarplot(model) {
-	return timeProcessBarplot(model.get("events"), {
+	// Pre-aggregated in Python; the fallbacks bin every node's creation time
+	const histogram = model.get("_histogram");
+	const columns = histogram ? null : getColumns(model);
+	return timeProcessBarplot(histogram ? [] : columns ? columns.dates() : model.get("events"), {
+		...(columns ? { x: d => d } : {}),
+		histogram,
 		width: 400,
 		height: 150,
 		startDate: model.get("_start_date") ? new Date(model.get("_start_date")) : null,
@@ -24,12 +44,28 @@ function createTimeProcessBarplot(model) {
 
 // filterAndSortData moved to utils.js
 
+// True when Python has already applied the time window to the synced events
+function isServerFiltered(model) {
+	return model.get("server_filter")
+		&& model.get("show_timefilter")
+		&& Boolean(model.get("_start_date") || model.get("_end_date"));
+}
+
 function initializeProcessTree(processTree, model) {
-	let allEvents = filterAndSortData(
-		model.get("events"),
-		model.get("show_timefilter") ? model.get("_start_date") : null,
-		model.get("show_timefilter") ? model.get("_end_date") : null
-	);
+	// Nothing to show until a background build sends the first levels
+	if (model.get("_status") === "loading" && !model.get("events").length && !getColumns(model)) {
+		return;
+	}
+
+	// With server-side filtering the synced events are already filtered and sorted
+	const filterHere = model.get("show_timefilter") && !model.get("server_filter");
+	const startDate = filterHere ? model.get("_start_date") : null;
+	const endDate = filterHere ? model.get("_end_date") : null;
+
+	const columns = getColumns(model);
+	let allEvents = columns
+		? columns.entities(filterHere ? filterAndSortIndices(columns, startDate, endDate) : undefined)
+		: filterAndSortData(model.get("events"), startDate, endDate);
 
 	let process_id = model.get("process_id");
 	let processEvent = allEvents.find(d => d.ProcessId == process_id);
@@ -75,6 +111,11 @@ export default {
               <div id="timefilter-chart-container"></div>
             </div>`
           : null}
+        <div id="loading" style="display:none;align-items:center;gap:8px;">
+          <progress max="1"></progress>
+          <span></span>
+          <button title="Stop building the tree" onclick=${() => model.send({ type: "cancel" })}>Cancel</button>
+        </div>
         <div id="tree" style="flex:1;min-height:400px;padding:10px;display:flex;align-items:center;justify-content:center;"></div>
       </div>
     `;
@@ -90,7 +131,13 @@ export default {
     processTree = new ProcessTree(treeContainer);
     processTree.setOptions({
       textStyleColor: "#506e86",
-      modifyEntityName: ({ ProcessName }) => ProcessName,
+      // Lazy loading: show how many children can still be loaded. Collapsed sibling
+      // groups show how many processes they stand for
+      modifyEntityName: ({ ProcessName, _child_count, Count }) => {
+        const name = Count ? `${ProcessName} ×${Count}` : ProcessName;
+        return _child_count > 0 && !Count ? `${name} (+${_child_count})` : name;
+      },
+      loadChildren: (node) => model.send({ type: "expand", name: node._name }),
   textClick: () => null,
       selectedNodeStrokeColor: "#506e86",
       selectedNodeColor: "#7b9fce",
@@ -108,27 +155,75 @@ export default {
       parentNodeTextOrientation: 'right',
       childNodeTextOrientation: 'right',
       nodeClick: (node) => {
-        model.set("process_id", node.ProcessId);
-        model.save_changes();
+        // Collapsed sibling groups are not a process
+        if (node.ProcessId !== undefined) {
+          model.set("process_id", node.ProcessId);
+          model.save_changes();
+        }
         processTree.tree.selectedNode = node;
+        if (node._child_count > 0) {
+          model.send({ type: "expand", name: node._name });
+        }
       }
     });
 
+    // Progress of a background build (see ProcessTreeWidget's `background`)
+    const loading = layout.querySelector("#loading");
+    const onStatusChange = () => {
+      const status = model.get("_status");
+      loading.style.display = status === "ready" ? "none" : "flex";
+      loading.querySelector("progress").value = model.get("_progress");
+      loading.querySelector("progress").style.display = status === "loading" ? "" : "none";
+      loading.querySelector("button").style.display = status === "loading" ? "" : "none";
+      const stage = model.get("_stage") ?? "";
+      loading.querySelector("span").textContent =
+        status === "cancelled" ? "Cancelled" : status === "failed" ? `Failed: ${stage}` : stage;
+    };
+    onStatusChange();
+    model.on("change:_status", onStatusChange);
+    model.on("change:_stage", onStatusChange);
+    model.on("change:_progress", onStatusChange);
+
     // --- model listeners ---
+    // The brush is drawn from `_start_date`/`_end_date`, so a redraw keeps the selection
+    const redrawTimeChart = () => {
+      const chartContainer = layout.querySelector("#timefilter-chart-container");
+      if (!model.get("show_timefilter") || !chartContainer) return;
+      if (timeChart) timeChart.remove();
+      timeChart = createTimeProcessBarplot(model);
+      chartContainer.appendChild(timeChart);
+    };
+    // New or changed nodes (e.g. from `append_events`) come with a new histogram
+    model.on("change:_histogram", redrawTimeChart);
+
     const onEventsChange = () => {
-      if (model.get("show_timefilter")) {
-        if (timeChart) timeChart.remove();
-        const chartContainer = layout.querySelector("#timefilter-chart-container");
-        if (chartContainer) {
-          timeChart = createTimeProcessBarplot(model);
-          chartContainer.appendChild(timeChart);
-        }
-      }
+      // Without a histogram the chart bins the synced events, so keep the chart of
+      // the whole tree while a server-filtered window is shown
+      if (!model.get("_histogram") && !isServerFiltered(model)) redrawTimeChart();
       initializeProcessTree(processTree, model);
     };
     model.on("change:events", onEventsChange);
+    model.on("change:_columns", onEventsChange);
+
+    // Incremental updates from `append_events`: patch the synced list in place
+    // instead of receiving the whole list again. The drawn tree is not patched:
+    // `ProcessTree.initialize` builds a new DependenTree from the whole list.
+    const onCustomMessage = (msg, buffers) => {
+      if (msg?.type !== "delta") return;
+      if (msg.expand) processTree.pendingExpand.add(msg.expand);
+      if (msg.columns) {
+        getColumns(model)?.applyDelta(msg.columns, buffers);
+      } else {
+        applyEventsDelta(model.get("events"), msg.events);
+      }
+      onEventsChange();
+    };
+    model.on("msg:custom", onCustomMessage);
 
-    const onDateChange = () => initializeProcessTree(processTree, model);
+    // With server-side filtering, the new window arrives as an events change
+    const onDateChange = () => {
+      if (!model.get("server_filter")) initializeProcessTree(processTree, model);
+    };
     model.on("change:_start_date", onDateChange);
     model.on("change:_end_date", onDateChange);
 
@@ -145,7 +240,15 @@ export default {
 
     // --- cleanup ---
     return () => {
+      // The output was removed (e.g. the cell re-ran), nobody waits for the build
+      if (model.get("_status") === "loading") model.send({ type: "cancel" });
+      model.off("change:_status", onStatusChange);
+      model.off("change:_stage", onStatusChange);
+      model.off("change:_progress", onStatusChange);
+      model.off("change:_histogram", redrawTimeChart);
       model.off("change:events", onEventsChange);
+      model.off("change:_columns", onEventsChange);
+      model.off("msg:custom", onCustomMessage);
       model.off("change:_start_date", onDateChange);
       model.off("change:_end_date", onDateChange);
       model.off("change:show_timefilter", onShowTimefilterChange);
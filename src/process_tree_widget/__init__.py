@@ -1,10 +1,22 @@
 import importlib.metadata
 import pathlib
+import threading
+
+from datetime import datetime
 
 import anywidget
+import pyarrow as pa
 import traitlets
-from process_tree_widget.tree import ProcessTree
-from process_tree_widget.utils import prepare_events
+from process_tree_widget.arrow import prepare_volatility_table
+from process_tree_widget.cache import TreeCache
+from process_tree_widget.enrich import enrich as enrich_tree
+from process_tree_widget.forest import ProcessForest
+from process_tree_widget.prefetch import Prefetcher
+from process_tree_widget.stats import Stats
+from process_tree_widget.transport import encode_columns, encode_histograms, split_buffers
+from process_tree_widget.tree import Process, ProcessTree, SiblingGroup
+from process_tree_widget.utils import prepare_events, prepare_process_graph
+from typing import Any, Callable
 
 try:
     __version__ = importlib.metadata.version("process_tree_widget")
@@ -12,14 +24,26 @@ except importlib.metadata.PackageNotFoundError:
     __version__ = "unknown"
 
 
+class _Cancelled(Exception):
+    """Raised in the background build when it was cancelled."""
+
+
 class ProcessTreeWidget(anywidget.AnyWidget):
     _esm = pathlib.Path(__file__).parent / "static" / "widget.js"
 
     process_id = traitlets.Int(-1).tag(sync=True)
     events: traitlets.List = traitlets.List([]).tag(sync=True)
+    _columns = traitlets.Dict(None, allow_none=True).tag(sync=True)
+    # Creation time histograms of the whole tree, for the time filter
+    _histogram = traitlets.Dict(None, allow_none=True).tag(sync=True)
     _start_date = traitlets.Unicode(None, allow_none=True).tag(sync=True)
     _end_date = traitlets.Unicode(None, allow_none=True).tag(sync=True)
     show_timefilter = traitlets.Bool(True).tag(sync=True)
+    server_filter = traitlets.Bool(True).tag(sync=True)
+    # Background construction: "loading", "ready", "cancelled" or "failed"
+    _status = traitlets.Unicode("ready").tag(sync=True)
+    _stage = traitlets.Unicode(None, allow_none=True).tag(sync=True)
+    _progress = traitlets.Float(1.0).tag(sync=True)
 
     def __init__(
         self,
@@ -28,6 +52,18 @@ class ProcessTreeWidget(anywidget.AnyWidget):
         end_date=None,
         source: str | None = None,
         show_timefilter: bool = True,
+        transport: str = "json",
+        server_filter: bool = True,
+        lazy: bool = False,
+        lazy_depth: int = 2,
+        partition_by: str | None = None,
+        resolve_in_engine: bool = False,
+        cache: TreeCache | bool = False,
+        prefetch: Callable[[Process], Any] | Prefetcher | None = None,
+        background: bool = False,
+        collapse_siblings: int | None = None,
+        collapse_by: str | None = None,
+        reconcile: bool = False,
         **kwargs,
     ):
         """Initialize the widget.
@@ -39,14 +75,480 @@ class ProcessTreeWidget(anywidget.AnyWidget):
         If an ibis table is provided and `source` is supplied ("mde" or "volatility"),
         the table is first normalized via utils.prepare_events (if available) before
         constructing the dependentree format expected by the frontend.
+
+        `transport` selects how the tree is sent to the frontend: "json" syncs the
+        dependentree list through `events`, "binary" syncs packed typed-array buffers
+        (see transport.encode_columns) through `_columns`, which is much smaller and
+        is decoded in the browser without a JSON parse.
+
+        With `server_filter` (the default) the time filter is applied here, from the
+        `_start_date`/`_end_date` traits, and only the nodes in the window are sent to
+        the frontend. Otherwise the full tree is sent and filtered in the browser.
+
+        With `lazy`, only the first `lazy_depth` levels below the root are sent, and
+        the last level carries its number of children in `_child_count`. The frontend
+        requests a node's children with an `{"type": "expand", "name": ...}` message
+        when it is expanded, so the initial render does not depend on the tree size.
+
+        With `partition_by` (e.g. "DeviceName"), one tree is built per value of that
+        column, in parallel worker processes, and shown under one node per value (see
+        forest.ProcessForest). Use it for events from more than one device, or for
+        Volatility output from more than one memory image (e.g. "ImageId").
+
+        With `resolve_in_engine`, process identity and parents are resolved by the
+        ibis backend (see utils.prepare_process_graph) and only one row per process is
+        fetched, instead of every event. It cannot be combined with `partition_by`.
+
+        With `cache` (True for the default location, or a cache.TreeCache), the built
+        tree is stored on disk, keyed by a fingerprint of the events expression and
+        the files it reads, and reused as long as they don't change.
+
+        With `prefetch` (a function of a `Process`, or a prefetch.Prefetcher), the
+        function is run in a thread pool for the selected process and, ahead of
+        time, for its parent, children and siblings, e.g. to query their DLLs or
+        network connections. `related` returns the selected process's result.
+        Closing the widget shuts the prefetcher's thread pool down.
+
+        With `background`, the widget is returned right away and the tree is built in
+        a worker thread. The frontend shows the build's progress (`_status`, `_stage`
+        and `_progress`), then the first `lazy_depth` levels as soon as the tree is
+        built, then the whole tree once it is encoded.
+        `cancel` stops the build at the next stage, as does closing the widget or
+        removing its output (e.g. re-running the cell); `wait` blocks until it is
+        done. Methods that need the tree wait for it.
+
+        With `collapse_siblings` (a threshold, e.g. 50), children of one node that
+        share a filename and number more than the threshold are sent as a single
+        node with their count and first and last creation times (see
+        ProcessTree.sibling_groups). Expanding it in the frontend loads the members.
+        `collapse_by` also groups them by an attribute (see `enrich`), e.g. a command
+        line signature. It needs the JSON transport and cannot be combined with
+        `lazy`.
+
+        With `reconcile`, the tree is built in one batch that doesn't depend on the
+        order of the events (see ProcessTree.build_tree_reconciled), for merged or
+        out-of-order exports with reused process ids. It cannot be combined with
+        `resolve_in_engine`, which resolves the processes in the backend instead.
+
+        `stats` records the wall time, row count and memory of each stage of the
+        pipeline: the query and `to_pyarrow`, building the tree, encoding it and
+        syncing it to the frontend; the tree's own `stats` break the build down
+        further. See stats.Stats, and stats.add_hook to export them.
         """
         super().__init__(**kwargs)
 
-        raw_list = prepare_events(events, source).to_pyarrow().to_pylist()
-        tree = ProcessTree(raw_list)
-        processed_events = tree.create_dependentree_format()
+        if transport not in ("json", "binary"):
+            raise ValueError(
+                f"Unknown transport '{transport}'. Expected 'json' or 'binary'."
+            )
+        if partition_by and resolve_in_engine:
+            raise ValueError("partition_by cannot be combined with resolve_in_engine")
+        if reconcile and resolve_in_engine:
+            raise ValueError("reconcile cannot be combined with resolve_in_engine")
+        if collapse_siblings is not None and (lazy or transport != "json"):
+            raise ValueError(
+                "collapse_siblings needs transport='json' and cannot be combined with lazy"
+            )
+        if source is None:
+            raise ValueError("source must be 'mde' or 'volatility'")
 
-        self.events = processed_events
+        self._source = source
+        self._transport = transport
+        self._lazy = lazy
+        self._lazy_depth = lazy_depth
+        self._window_nodes: set[int] | None = None
+        self._collapse_siblings = collapse_siblings
+        self._collapse_by = collapse_by
+        self._groups: dict[str, SiblingGroup] = {}
+        self._expanded_groups: set[str] = set()
+        self._names_synced = 0
+        self._prefetcher = (
+            prefetch
+            if prefetch is None or isinstance(prefetch, Prefetcher)
+            else Prefetcher(prefetch)
+        )
         self._start_date = start_date.isoformat() if start_date else None
         self._end_date = end_date.isoformat() if end_date else None
-        self.show_timefilter = show_timefilter
\ No newline at end of file
+        self.show_timefilter = show_timefilter
+        self.server_filter = server_filter
+        self._lock = threading.RLock()
+        self._cancelled = threading.Event()
+        self._builder: threading.Thread | None = None
+        self._build_error: BaseException | None = None
+        self.stats = Stats()
+
+        def build() -> ProcessTree:
+            self._report("Fetching events", 0.1)
+            volatility = source and source.lower() == "volatility"
+            if resolve_in_engine:
+                table = self._query(prepare_process_graph(events, source)[0])
+            elif volatility:
+                table = self._query(events)
+                with self.stats.stage("prepare_volatility_table", table.num_rows):
+                    # One row per process, resolved in Arrow instead of two self-joins
+                    table = prepare_volatility_table(table, partition_by)
+            else:
+                table = self._query(prepare_events(events, source))
+
+            self._report("Building tree", 0.5)
+            with self.stats.stage("build_tree", table.num_rows):
+                if resolve_in_engine:
+                    return ProcessTree.from_nodes(table)
+                if partition_by:
+                    return ProcessForest.from_arrow(
+                        table, partition_by, reconcile=reconcile
+                    )
+                return ProcessTree.from_arrow(table, reconcile)
+
+        def construct() -> ProcessTree:
+            if not cache:
+                return build()
+            tree_cache = TreeCache() if cache is True else cache
+            with self.stats.stage("cache") as stage:
+                tree = tree_cache.get_or_build(
+                    events,
+                    source,
+                    build,
+                    partition_by=partition_by,
+                    resolve_in_engine=resolve_in_engine,
+                    reconcile=reconcile,
+                )
+                stage.rows = len(tree)
+            return tree
+
+        self.on_msg(self._on_frontend_message)
+
+        if background:
+            self._status = "loading"
+            self._report("Starting", 0.0)
+            self._builder = threading.Thread(
+                target=self._build_in_background,
+                args=(construct,),
+                name="process-tree-build",
+                daemon=True,
+            )
+            self._builder.start()
+            return
+
+        self._tree = construct()
+        self._push_events()
+        self._prefetch_selected()
+
+    def _query(self, expression: Any) -> pa.Table:
+        """Run an ibis expression, as the `query` stage."""
+        with self.stats.stage("query") as stage:
+            table = expression.to_pyarrow()
+            stage.rows = table.num_rows
+        return table
+
+    def _report(self, stage: str, progress: float) -> None:
+        """Update the build progress shown by the frontend, stopping if cancelled."""
+        if self._cancelled.is_set():
+            raise _Cancelled
+        if self._status == "loading":
+            self._stage = stage
+            self._progress = progress
+
+    def _build_in_background(self, construct: Callable[[], ProcessTree]) -> None:
+        try:
+            tree = construct()
+            self._report("Sending tree", 0.9)
+            with self._lock:
+                self._tree = tree
+                if not self._lazy:
+                    # The top levels first, while the whole tree is encoded
+                    self._push_events(depth=self._lazy_depth)
+            self._report("Sending tree", 0.95)
+            with self._lock:
+                self._push_events()
+                self._prefetch_selected()
+            self._report("Done", 1.0)
+            self._status = "ready"
+        except _Cancelled:
+            self._status = "cancelled"
+        except Exception as error:
+            self._build_error = error
+            self._stage = f"{type(error).__name__}: {error}"
+            self._status = "failed"
+
+    def cancel(self) -> None:
+        """Stop a background build at its next stage. Does nothing once it is done."""
+        self._cancelled.set()
+
+    def wait(self, timeout: float | None = None) -> "ProcessTreeWidget":
+        """Wait for a background build to finish.
+
+        Raises the build's exception if it failed, and a ValueError if it was
+        cancelled or is still running after `timeout` seconds.
+        """
+        if self._builder is not None:
+            self._builder.join(timeout)
+            if self._builder.is_alive():
+                raise ValueError(f"The tree is still being built after {timeout}s")
+        if self._build_error is not None:
+            raise self._build_error
+        if self._status == "cancelled":
+            raise ValueError("The tree was not built, the build was cancelled")
+        return self
+
+    def close(self) -> None:
+        self.cancel()
+        if self._prefetcher is not None:
+            self._prefetcher.shutdown()
+        super().close()
+
+    def _time_window(self) -> tuple[datetime | None, datetime | None] | None:
+        """The active time window, or None when the frontend should get every node."""
+        if not (self.server_filter and self.show_timefilter):
+            return None
+        if not (self._start_date or self._end_date):
+            return None
+
+        def parse(value: str | None) -> datetime | None:
+            return datetime.fromisoformat(value) if value else None
+
+        return parse(self._start_date), parse(self._end_date)
+
+    def _push_events(self, depth: int | None = None) -> None:
+        """Send the tree, or the part of it inside the time window, to the frontend.
+
+        With `depth` (implied by `lazy`), only the first `depth` levels are sent.
+        """
+        # Node indices throughout; identifiers are only built by the encoders
+        window = self._time_window()
+        indices = self._tree.filter_time_window(*window) if window else None
+        child_counts = None
+        if self._lazy:
+            depth = self._lazy_depth
+
+        if depth is not None:
+            # Only the top levels; the last one tells the frontend what can be expanded
+            self._window_nodes = None if indices is None else set(indices)
+            levels = self._tree.levels(depth=depth, include=self._window_nodes)
+            indices = [index for level in levels for index in level]
+            child_counts = [0] * (len(indices) - len(levels[-1])) + (
+                self._tree.child_counts(levels[-1], self._window_nodes)
+            )
+
+        self._names_synced = len(self._tree.filenames)
+        self._push_histogram()
+        rows = len(self._tree) if indices is None else len(indices)
+        if self._transport == "binary":
+            with self.stats.stage("encode", rows):
+                columns = encode_columns(self._tree, indices, child_counts=child_counts)
+            with self.stats.stage("sync", rows):
+                self._columns = columns
+        else:
+            with self.stats.stage("encode", rows):
+                if self._collapse_siblings is not None:
+                    events = self._collapsed_events(indices)
+                else:
+                    events = self._tree.create_dependentree_format(indices=indices)
+                if child_counts is not None:
+                    for entry, count in zip(events, child_counts):
+                        entry["_child_count"] = count
+            with self.stats.stage("sync", rows):
+                self.events = events
+
+    def _collapsed_events(self, indices: list[int] | None) -> list[dict]:
+        """The dependentree entries with large sibling groups collapsed."""
+        assert self._collapse_siblings is not None
+        groups = self._tree.sibling_groups(
+            self._collapse_siblings,
+            self._collapse_by,
+            include=None if indices is None else set(indices),
+        )
+        self._groups = {group.identifier: group for group in groups}
+        return self._tree.collapsed_dependentree_format(
+            groups, indices, self._expanded_groups
+        )
+
+    def _send_group(self, name: str) -> None:
+        """Answer an `expand` request for a collapsed sibling group with its members."""
+        if name not in self._groups or name in self._expanded_groups:
+            return
+        self._expanded_groups.add(name)
+        window = self._time_window()
+        indices = self._tree.filter_time_window(*window) if window else None
+
+        sent = {entry["_name"] for entry in self.events}
+        events = self._tree.collapsed_dependentree_format(
+            self._groups.values(), indices, self._expanded_groups
+        )
+        delta = [
+            entry for entry in events if entry["_name"] not in sent or entry["_name"] == name
+        ]
+        with self.stats.stage("delta", len(delta)):
+            # In place, like `append_events`: the frontend patches its copy
+            self.events[:] = events
+            self.send({"type": "delta", "events": delta, "expand": name})
+
+    def _push_histogram(self) -> None:
+        if self.show_timefilter:
+            # Only sent when it changed
+            self._histogram = encode_histograms(self._tree)
+
+    def _send_delta(
+        self, identifiers: list[str], child_counts: list[int] | None = None, **extra: Any
+    ) -> None:
+        """Send added or changed nodes to the frontend as a `delta` custom message."""
+        with self.stats.stage("delta", len(identifiers)):
+            self._send_delta_message(identifiers, child_counts, **extra)
+
+    def _send_delta_message(
+        self, identifiers: list[str], child_counts: list[int] | None, **extra: Any
+    ) -> None:
+        if self._transport == "binary":
+            indices = [self._tree.node_index(name) for name in identifiers]
+            content, buffers = split_buffers(
+                encode_columns(self._tree, indices, self._names_synced, child_counts)
+            )
+            self._names_synced = len(self._tree.filenames)
+            self.send({"type": "delta", "columns": content, **extra}, buffers)
+            return
+
+        delta = self._tree.create_dependentree_format(identifiers)
+        if child_counts is not None:
+            for entry, count in zip(delta, child_counts):
+                entry["_child_count"] = count
+        self.send({"type": "delta", "events": delta, **extra})
+
+    def _on_frontend_message(
+        self, widget: "ProcessTreeWidget", content: dict, buffers: list
+    ) -> None:
+        if content.get("type") == "cancel":
+            self.cancel()
+        if content.get("type") == "expand" and self._collapse_siblings is not None:
+            with self._lock:
+                if hasattr(self, "_tree"):
+                    self._send_group(content["name"])
+        if content.get("type") == "expand" and self._lazy:
+            with self._lock:
+                if hasattr(self, "_tree"):
+                    self._send_children(content["name"])
+
+    def _send_children(self, name: str) -> None:
+        """Answer an `expand` request from the frontend with the node's children."""
+        identifier = name
+        if self._transport == "binary":
+            # The binary transport names nodes by their index
+            identifier = self._tree.node_identifier(int(name))
+        if identifier not in self._tree:
+            return
+
+        children = self._tree.children(identifier, self._window_nodes)
+        child_counts = [0] + [
+            self._tree.child_count(child, self._window_nodes) for child in children
+        ]
+        self._send_delta([identifier, *children], child_counts, expand=name)
+
+    @traitlets.observe("_start_date", "_end_date", "show_timefilter", "server_filter")
+    def _on_time_window_change(self, change: dict) -> None:
+        if hasattr(self, "_lock"):
+            with self._lock:
+                if hasattr(self, "_tree"):
+                    self._push_events()
+
+    @traitlets.observe("process_id")
+    def _on_process_id_change(self, change: dict) -> None:
+        if hasattr(self, "_lock"):
+            with self._lock:
+                if hasattr(self, "_tree"):
+                    self._prefetch_selected()
+
+    def _prefetch_selected(self) -> None:
+        if self._prefetcher is None:
+            return
+        identifier = self._tree.latest_node(self.process_id)
+        if identifier is not None:
+            self._prefetcher.prefetch(self._tree, identifier)
+
+    def related(self, timeout: float | None = None) -> Any:
+        """The `prefetch` function's result for the selected process.
+
+        Waits for it if it is still running, up to `timeout` seconds. Returns None
+        when no process is selected.
+        """
+        if self._prefetcher is None:
+            raise ValueError("related needs a prefetch function, see __init__")
+        self.wait()
+        identifier = self._tree.latest_node(self.process_id)
+        if identifier is None:
+            return None
+        return self._prefetcher.get(self._tree, identifier, timeout)
+
+    def append_events(self, events: Any) -> None:
+        """Add new process creation events to the widget without rebuilding its tree.
+
+        The events are normalized the same way as in the constructor and inserted into
+        the existing tree. Only the nodes that were added or changed are sent to the
+        frontend, as a `{"type": "delta", "events": [...]}` custom message, and patched
+        into `events` in place so the full list is not re-synced. With the binary
+        transport the delta carries the changed nodes' column buffers instead.
+
+        This saves the rebuild in Python and the transfer; the frontend still redraws
+        its tree from the patched list, at a cost that grows with the whole tree.
+        """
+        table = self._query(prepare_events(events, self._source))
+        self.wait()
+        with self.stats.stage("extend", table.num_rows):
+            changed = self._tree.extend(table)
+        if not changed:
+            return
+        self._push_histogram()
+
+        if self._lazy or self._time_window() or self._collapse_siblings is not None:
+            # The frontend holds a subset of the tree, send it again instead
+            self._push_events()
+            return
+
+        if self._transport == "binary":
+            self._send_delta(changed)
+            return
+
+        with self.stats.stage("delta", len(changed)):
+            delta = self._tree.create_dependentree_format(changed)
+            for entry in delta:
+                position = self._tree.node_index(entry["_name"])
+                if position < len(self.events):
+                    self.events[position] = entry
+                else:
+                    self.events.append(entry)
+
+            self.send({"type": "delta", "events": delta})
+
+    def enrich(
+        self,
+        dlllist: Any = None,
+        netscan: Any = None,
+        partition_column: str | None = None,
+    ) -> list[str]:
+        """Attach DllList and NetScan summaries to the tree's nodes.
+
+        dlllist and netscan are the Volatility plugins' output, as ibis or Arrow
+        tables. They are summarized per process (see enrich.enrich) and the
+        summaries show up in the node tooltips; look them up with
+        `selected_attributes` or filter on them with `ProcessTree.nodes_where`.
+        Use `partition_column` when the widget was built with `partition_by`.
+
+        Returns the names of the attributes that were added.
+        """
+
+        def to_arrow(table: Any) -> pa.Table:
+            return table.to_pyarrow() if hasattr(table, "to_pyarrow") else table
+
+        self.wait()
+        names = enrich_tree(
+            self._tree,
+            None if dlllist is None else to_arrow(dlllist),
+            None if netscan is None else to_arrow(netscan),
+            partition_column,
+        )
+        self._push_events()
+        return names
+
+    def selected_attributes(self) -> dict:
+        """The attributes (see `enrich`) of the process selected in the frontend."""
+        self.wait()
+        identifier = self._tree.latest_node(self.process_id)
+        return {} if identifier is None else self._tree.attributes(identifier)
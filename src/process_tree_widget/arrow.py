@@ -0,0 +1,357 @@
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from process_tree_widget.tree import Process, _to_ns
+from typing import Any, Callable, Final, List, Sequence, Tuple
+
+
+# The (id, filename, creation time) column triplets, in the order the tree consumes them.
+PROCESS_TRIPLETS: Final[Tuple[Tuple[str, str, str], ...]] = (
+    ("TargetProcessId", "TargetProcessFilename", "TargetProcessCreationTime"),
+    ("ActingProcessId", "ActingProcessFilename", "ActingProcessCreationTime"),
+    ("ParentProcessId", "ParentProcessFilename", "ParentProcessCreationTime"),
+)
+
+PROCESS_COLUMNS: Final[Tuple[str, ...]] = tuple(
+    column for triplet in PROCESS_TRIPLETS for column in triplet
+)
+
+# What `utils.prepare_volatility_data` fills in for a missing acting or parent process
+_MISSING: Final[Tuple[Any, Any, Any]] = (
+    Process.MISSING_PROCESS_ID,
+    Process.MISSING_FILE_NAME,
+    Process.MISSING_CREATION_TIME,
+)
+
+_DEFAULTS: Final[Tuple[Any, Any, Any]] = (
+    Process.MISSING_PROCESS_ID,
+    Process.MISSING_FILE_NAME,
+    _to_ns(Process.MISSING_CREATION_TIME),
+)
+
+
+def _coerce_column(column: pa.ChunkedArray, kind: int) -> pa.ChunkedArray | None:
+    """
+    Casts a column to the type `Process` expects for the given triplet position
+    (0 = id, 1 = filename, 2 = creation time, as int64 nanoseconds).
+
+    Returns None when the column cannot be converted without Python-level parsing;
+    those rows are left to pydantic.
+    """
+    if kind == 0:
+        if pa.types.is_integer(column.type):
+            return pc.cast(column, pa.int64())
+        return None
+
+    if kind == 1:
+        if pa.types.is_dictionary(column.type):
+            column = pc.cast(column, column.type.value_type)
+        if pa.types.is_string(column.type) or pa.types.is_large_string(column.type):
+            return column
+        return None
+
+    if pa.types.is_timestamp(column.type):
+        # Whole microseconds since the epoch (UTC) like `Process`, in nanoseconds
+        micros = column.cast(pa.timestamp("us", column.type.tz), safe=False)
+        return pc.multiply(micros.cast(pa.int64()), 1000)
+    return None
+
+
+def encode_strings(
+    column: pa.ChunkedArray | pa.Array, encode: Callable[[str], int]
+) -> List[int | None]:
+    """
+    Maps a string column to integer codes, calling `encode` once per distinct value
+    instead of creating a Python string per row. Nulls stay None.
+
+    Args:
+        column: A string or dictionary column
+        encode: Returns the code of a string, e.g. `ProcessTree._encode_filename`
+    """
+    if isinstance(column, pa.ChunkedArray):
+        column = column.combine_chunks()
+    if not pa.types.is_dictionary(column.type):
+        column = pc.dictionary_encode(column)
+    codes = [encode(value) for value in column.dictionary.to_pylist()]
+    return [None if i is None else codes[i] for i in column.indices.to_pylist()]
+
+
+def coerce_process_columns(
+    table: pa.Table, encode_filename: Callable[[str], int] | None = None
+) -> Tuple[List[List[Any]], pa.ChunkedArray | pa.Array]:
+    """
+    Converts the nine process columns of `table` into Python lists in one columnar pass.
+
+    Columns missing from the table are filled with the `Process` MISSING defaults.
+    A row is only marked valid when every present column could be cast and holds
+    no nulls, i.e. when `Process.model_validate` would accept it unchanged.
+
+    Args:
+        table: A table in the unified schema produced by `prepare_events`
+        encode_filename: When given, filenames are returned as the codes it assigns
+            (see `encode_strings`) instead of strings
+
+    Returns:
+        tuple[list[list], BooleanArray]: The nine columns in `PROCESS_COLUMNS`
+        order, with creation times as integer nanoseconds since the epoch, and a
+        per-row validity mask.
+    """
+    num_rows = table.num_rows
+    columns: List[List[Any]] = []
+    valid: pa.ChunkedArray | pa.Array = pa.array([True] * num_rows, pa.bool_())
+
+    for position, name in enumerate(PROCESS_COLUMNS):
+        kind = position % 3
+        is_target = position < 3
+
+        if name not in table.column_names:
+            if is_target:
+                # A required field is absent, pydantic has to report it
+                valid = pa.array([False] * num_rows, pa.bool_())
+                columns.append([None] * num_rows)
+            else:
+                default = _DEFAULTS[kind]
+                if kind == 1 and encode_filename is not None:
+                    default = encode_filename(default)
+                columns.append([default] * num_rows)
+            continue
+
+        column = _coerce_column(table.column(name), kind)
+        if column is None:
+            valid = pa.array([False] * num_rows, pa.bool_())
+            columns.append([None] * num_rows)
+            continue
+
+        if column.null_count:
+            valid = pc.and_(valid, pc.is_valid(column))
+
+        if kind == 1 and encode_filename is not None:
+            columns.append(encode_strings(column, encode_filename))
+        else:
+            columns.append(column.to_pylist())
+
+    return columns, valid
+
+
+def _volatility_keys(
+    table: pa.Table, images: pa.Array | None
+) -> Tuple[pa.Array, pa.Array]:
+    """
+    The `_vol_id` and `_vol_parent_id` lookup keys as int64. With several images the
+    image code goes in the upper 32 bits, so one lookup covers every image.
+    """
+    ids = table.column("_vol_id").combine_chunks().cast(pa.int64())
+    parent_ids = table.column("_vol_parent_id").combine_chunks().cast(pa.int64())
+    if images is None:
+        return ids, parent_ids
+
+    largest = pc.max(pc.max_element_wise(ids, parent_ids)).as_py()
+    if largest is not None and largest >= 2**32:
+        raise ValueError(
+            f"Invalid _vol_id {largest}. Expected ids below 2**32 with an image column."
+        )
+    image_keys = pc.shift_left(images.cast(pa.int64()), 32)
+    return pc.add(image_keys, ids), pc.add(image_keys, parent_ids)
+
+
+def prepare_volatility_table(
+    table: pa.Table, image_column: str | None = None
+) -> pa.Table:
+    """
+    Arrow version of `utils.prepare_volatility_data`, for a `windows.pstree` table
+    that is already in memory.
+
+    Instead of joining the table with itself twice, the row of each process's parent
+    is looked up once by `_vol_id` in a hash table (`pc.index_in`). The grandparent
+    is the parent's parent row, a `take` of the positions with themselves. Every
+    column is then gathered with a `take`, so the cost is one hash build and a few
+    linear passes.
+
+    Args:
+        table: `windows.pstree` rows with `PID`, `ImageFileName`, `CreateTime`,
+            `_vol_id` and `_vol_parent_id` columns
+        image_column: For the output of several memory images, the column naming
+            each row's image. Parents are only looked up within the same image.
+
+    Returns:
+        pa.Table: The rows in the unified schema, sorted by `CreateTime` (ties keep
+        their input order)
+    """
+    images = None
+    if image_column is not None:
+        images = pc.dictionary_encode(table.column(image_column)).combine_chunks().indices
+
+    ids, parent_ids = _volatility_keys(table, images)
+    # Row of each process's parent, null for roots and parents that aren't listed
+    acting = pc.index_in(parent_ids, value_set=ids, skip_nulls=True)
+    parent = pc.take(acting, acting)
+
+    columns = {}
+    for name, positions in (("Target", None), ("Acting", acting), ("Parent", parent)):
+        for source, suffix, kind in (
+            ("PID", "ProcessId", 0),
+            ("ImageFileName", "ProcessFilename", 1),
+            ("CreateTime", "ProcessCreationTime", 2),
+        ):
+            column = table.column(source)
+            if positions is not None:
+                column = pc.fill_null(
+                    pc.take(column, positions), pa.scalar(_MISSING[kind], column.type)
+                )
+            columns[f"{name}{suffix}"] = column
+    columns["Timestamp"] = table.column("CreateTime")
+
+    for name, column in columns.items():
+        table = table.append_column(name, column)
+    return table.take(pc.sort_indices(table, [("CreateTime", "ascending")]))
+
+
+def reconcile_processes(columns: Sequence[List[int]], filenames: Sequence[str]) -> pa.Table:
+    """
+    Resolves every process seen in a batch of events to its best filename and
+    parent, independent of the order of the rows (see
+    `ProcessTree.build_tree_reconciled` for the rules). Each row is an observation
+    of its target, acting and parent process; the best observation per process is
+    picked with one sort and group-by, and parents are matched with a hash join.
+
+    Args:
+        columns: The nine process columns as `coerce_process_columns` returns them,
+            with filename codes
+        filenames: The strings of the filename codes
+
+    Returns:
+        pa.Table: One row per process (`pid`, `ns`, `filename`), sorted by creation
+        time and pid, with the row position of its `parent` (null for none)
+    """
+    missing = Process.MISSING_PROCESS_ID
+    (
+        target_id, target_name, target_ns,
+        acting_id, acting_name, acting_ns,
+        parent_id, parent_name, parent_ns,
+    ) = (pa.array(column, pa.int64()) for column in columns)
+    no_acting = pc.equal(acting_id, missing)
+    no_parent = pc.equal(parent_id, missing)
+
+    def nulls_where(mask: pa.Array, values: pa.Array) -> pa.Array:
+        return pc.if_else(mask, pa.scalar(None, pa.int64()), values)
+
+    # Target, acting and parent process of every row, with the process they name as
+    # parent, how much the row knows about them and when the row happened (the target's
+    # creation time)
+    observed = pa.concat_tables(
+        [
+            pa.table(
+                {
+                    "pid": target_id,
+                    "ns": target_ns,
+                    "filename": target_name,
+                    "rank": pa.repeat(2, len(target_id)),
+                    "event": target_ns,
+                    "parent_pid": nulls_where(no_acting, acting_id),
+                    "parent_ns": nulls_where(no_acting, acting_ns),
+                }
+            ),
+            pa.table(
+                {
+                    "pid": acting_id,
+                    "ns": acting_ns,
+                    "filename": acting_name,
+                    "rank": pa.repeat(1, len(acting_id)),
+                    "event": target_ns,
+                    "parent_pid": nulls_where(no_parent, parent_id),
+                    "parent_ns": nulls_where(no_parent, parent_ns),
+                }
+            ).filter(pc.invert(no_acting)),
+            pa.table(
+                {
+                    "pid": parent_id,
+                    "ns": parent_ns,
+                    "filename": parent_name,
+                    "rank": pa.repeat(0, len(parent_id)),
+                    "event": target_ns,
+                    "parent_pid": pa.nulls(len(parent_id), pa.int64()),
+                    "parent_ns": pa.nulls(len(parent_id), pa.int64()),
+                }
+            ).filter(pc.invert(no_parent)),
+        ]
+    )
+
+    # Filenames, as `ProcessTree.build_tree_from_arrow` renames nodes on rows in event
+    # order: the latest row that names the process's parent, else the earliest row,
+    # then the first name in sort order
+    lexical = [0] * len(filenames)
+    for position, code in enumerate(sorted(range(len(filenames)), key=filenames.__getitem__)):
+        lexical[code] = position
+    renames = pc.is_valid(observed.column("parent_pid"))
+    event, rank = observed.column("event"), observed.column("rank")
+    observed = (
+        observed.append_column("renames", renames)
+        .append_column("recency", pc.if_else(renames, event, pc.negate(event)))
+        .append_column("order", pc.if_else(renames, rank, pc.negate(rank)))
+        .append_column(
+            "lexical", pc.take(pa.array(lexical, pa.int64()), observed.column("filename"))
+        )
+    )
+    best_names = (
+        observed.sort_by(
+            [
+                ("pid", "ascending"),
+                ("ns", "ascending"),
+                ("renames", "descending"),
+                ("recency", "descending"),
+                ("order", "descending"),
+                ("lexical", "ascending"),
+            ]
+        )
+        .group_by(["pid", "ns"], use_threads=False)
+        .aggregate([("filename", "first")])
+    )
+
+    # Parents: created before the process, the better informed row, the most recently
+    # created, then the lowest pid
+    candidates = observed.filter(pc.is_valid(observed.column("parent_pid")))
+    candidates = candidates.append_column(
+        "before", pc.less_equal(candidates.column("parent_ns"), candidates.column("ns"))
+    )
+    best_parents = (
+        candidates.sort_by(
+            [
+                ("pid", "ascending"),
+                ("ns", "ascending"),
+                ("before", "descending"),
+                ("rank", "descending"),
+                ("parent_ns", "descending"),
+                ("parent_pid", "ascending"),
+            ]
+        )
+        .group_by(["pid", "ns"], use_threads=False)
+        .aggregate([("parent_pid", "first"), ("parent_ns", "first")])
+    )
+
+    processes = best_names.rename_columns(["pid", "ns", "filename"]).sort_by(
+        [("ns", "ascending"), ("pid", "ascending")]
+    )
+    processes = processes.append_column(
+        "node", pa.array(range(processes.num_rows), pa.int64())
+    )
+    parents = best_parents.rename_columns(["pid", "ns", "parent_pid", "parent_ns"]).join(
+        processes.select(["pid", "ns", "node"]).rename_columns(
+            ["parent_pid", "parent_ns", "parent"]
+        ),
+        keys=["parent_pid", "parent_ns"],
+        use_threads=False,
+    )
+    processes = processes.join(
+        parents.select(["pid", "ns", "parent"]), keys=["pid", "ns"], use_threads=False
+    )
+    return processes.sort_by("node").select(["pid", "ns", "filename", "parent"])
+
+
+__all__ = [
+    "PROCESS_COLUMNS",
+    "PROCESS_TRIPLETS",
+    "coerce_process_columns",
+    "encode_strings",
+    "prepare_volatility_table",
+    "reconcile_processes",
+]
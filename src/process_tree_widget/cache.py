@@ -0,0 +1,272 @@
+import glob
+import hashlib
+import os
+import pathlib
+import re
+import tempfile
+
+import ibis
+import ibis.expr.operations as ops
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from process_tree_widget.forest import ProcessForest
+from process_tree_widget.tree import ProcessTree
+from process_tree_widget.utils import prepare_events
+from typing import Any, Callable, Dict, Final, Iterable, List
+
+
+# Classes a cached table can be restored as, by the `class` schema metadata
+_TREE_CLASSES: Final[Dict[str, type[ProcessTree]]] = {
+    cls.__name__: cls for cls in (ProcessTree, ProcessForest)
+}
+
+_QUOTED: Final[re.Pattern] = re.compile(r"'([^']+)'")
+
+
+def _default_directory() -> pathlib.Path:
+    base = os.environ.get("XDG_CACHE_HOME") or pathlib.Path.home() / ".cache"
+    return pathlib.Path(base) / "process_tree_widget"
+
+
+def _file_paths(definition: str) -> List[str]:
+    """The existing files (or glob matches) named by string literals in a definition."""
+    paths: List[str] = []
+    for literal in _QUOTED.findall(definition):
+        matches = glob.glob(literal) if glob.has_magic(literal) else [literal]
+        paths.extend(path for path in matches if os.path.isfile(path))
+    return sorted(paths)
+
+
+def _table_definition(table: ops.DatabaseTable) -> str:
+    """
+    The definition of a backend table, for tables whose names are generated per
+    session (e.g. `ibis.read_parquet` views on DuckDB). Other tables are identified
+    by their name.
+    """
+    name: str = table.name
+    backend = table.source
+    if getattr(backend, "name", None) == "duckdb":
+        rows = backend.raw_sql(
+            "SELECT sql FROM duckdb_views() WHERE view_name = ?", parameters=[name]
+        ).fetchall()
+        if rows:
+            definition: str = rows[0][0]
+            return definition.replace(name, "<table>")
+    return name
+
+
+def _hash_file(digest: Any, path: str, content_hash: bool) -> None:
+    stat = os.stat(path)
+    digest.update(f"{os.path.abspath(path)}|{stat.st_size}|{stat.st_mtime_ns}".encode())
+    if content_hash:
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+
+
+def fingerprint(
+    events: Any,
+    source: str,
+    files: Iterable[str] = (),
+    content_hash: bool = False,
+    **options: Any,
+) -> str:
+    """
+    Returns a key identifying the tree built from `events`, for `TreeCache`.
+
+    The key covers the SQL of the prepared expression, the `source`, any build
+    `options` (e.g. `partition_by`) and the files the expression reads: their path,
+    size and modification time, or their content with `content_hash`. Files are
+    found from DuckDB's view definitions (as created by `ibis.read_parquet` and
+    friends); for other backends, pass the files that back the tables as `files`.
+    In-memory tables are keyed by their content.
+
+    Args:
+        events: The raw events ibis table
+        source: One of "mde" or "volatility"
+        files: Additional files the events depend on
+        content_hash: Hash file contents instead of trusting size and mtime
+        **options: Anything else that changes the built tree
+
+    Returns:
+        str: A hex digest
+    """
+    digest = hashlib.sha256()
+    digest.update(source.lower().encode())
+    digest.update(repr(sorted(options.items())).encode())
+
+    sql = str(ibis.to_sql(prepare_events(events, source)))
+    paths = set(files)
+    for position, table in enumerate(events.op().find((ops.DatabaseTable, ops.InMemoryTable))):
+        # Generated table names change between sessions, key by what they contain
+        sql = sql.replace(table.name, f"<table{position}>")
+        if isinstance(table, ops.InMemoryTable):
+            # Parquet only writes valid values, unlike IPC the bytes don't depend on
+            # what happens to be stored under nulls
+            data = table.data.to_pyarrow(table.schema).combine_chunks()
+            sink = pa.BufferOutputStream()
+            pq.write_table(data, sink, compression="none")
+            digest.update(hashlib.sha256(sink.getvalue()).digest())
+        else:
+            definition = _table_definition(table)
+            digest.update(definition.encode())
+            paths.update(_file_paths(definition))
+    digest.update(sql.encode())
+
+    for path in sorted(paths):
+        _hash_file(digest, path, content_hash)
+
+    return digest.hexdigest()
+
+
+class TreeCache:
+    """An on-disk cache of built trees, keyed by `fingerprint`.
+
+    Trees are stored with `ProcessTree.to_table` as compressed Arrow IPC files, one
+    per key, so a hit costs a file read instead of querying and rebuilding. The
+    cache is bounded by `max_bytes`: after each store, the least recently used
+    files are removed until it fits.
+
+    Example:
+    ```python
+        cache = TreeCache()
+        tree = cache.get_or_build(events, "mde", lambda: build(events))
+        ...
+        cache.invalidate(events, "mde")
+    ```
+    """
+
+    SUFFIX: Final[str] = ".arrow"
+
+    def __init__(
+        self,
+        directory: str | os.PathLike | None = None,
+        max_bytes: int = 2 * 1024**3,
+        compression: str | None = "zstd",
+    ):
+        self.directory = pathlib.Path(directory) if directory else _default_directory()
+        self.max_bytes = max_bytes
+        self.compression = compression
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, key: str) -> pathlib.Path:
+        return self.directory / f"{key}{TreeCache.SUFFIX}"
+
+    def __contains__(self, key: object) -> bool:
+        return isinstance(key, str) and self._path(key).exists()
+
+    def get(self, key: str) -> ProcessTree | None:
+        """Returns the cached tree for `key`, or None on a miss."""
+        path = self._path(key)
+        try:
+            with pa.memory_map(str(path)) as source:
+                table = pa.ipc.open_file(source).read_all()
+        except (FileNotFoundError, pa.ArrowInvalid):
+            return None
+
+        # Recently used, for eviction
+        os.utime(path)
+
+        name = (table.schema.metadata or {}).get(b"class", b"").decode()
+        if name not in _TREE_CLASSES:
+            return None
+        return _TREE_CLASSES[name].from_table(table)
+
+    def put(self, key: str, tree: ProcessTree) -> pathlib.Path:
+        """Stores a tree under `key`, then evicts entries beyond `max_bytes`."""
+        table = tree.to_table()
+        options = pa.ipc.IpcWriteOptions(compression=self.compression)
+
+        # Write to a temporary file first, so readers never see a partial file
+        fd, temporary = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as sink:
+                with pa.ipc.new_file(sink, table.schema, options=options) as writer:
+                    writer.write_table(table)
+            os.replace(temporary, self._path(key))
+        except BaseException:
+            os.unlink(temporary)
+            raise
+
+        self.evict()
+        return self._path(key)
+
+    def get_or_build(
+        self,
+        events: Any,
+        source: str,
+        build: Callable[[], ProcessTree],
+        files: Iterable[str] = (),
+        **options: Any,
+    ) -> ProcessTree:
+        """
+        Returns the cached tree for these events, or builds and stores it.
+
+        Args:
+            events: The raw events ibis table
+            source: One of "mde" or "volatility"
+            build: Builds the tree on a miss
+            files: Additional files the events depend on, see `fingerprint`
+            **options: Build options that change the tree, part of the key
+        """
+        key = fingerprint(events, source, files, **options)
+        tree = self.get(key)
+        if tree is None:
+            tree = build()
+            self.put(key, tree)
+        return tree
+
+    def entries(self) -> List[pathlib.Path]:
+        """The cache files, least recently used first."""
+        paths = self.directory.glob(f"*{TreeCache.SUFFIX}")
+        return sorted(paths, key=lambda path: path.stat().st_mtime_ns)
+
+    def size(self) -> int:
+        """Total size of the cache files in bytes."""
+        return sum(path.stat().st_size for path in self.entries())
+
+    def evict(self) -> None:
+        """Removes the least recently used entries until the cache fits `max_bytes`."""
+        entries = self.entries()
+        total = sum(path.stat().st_size for path in entries)
+        for path in entries:
+            if total <= self.max_bytes:
+                break
+            total -= path.stat().st_size
+            path.unlink(missing_ok=True)
+
+    def invalidate(
+        self,
+        events: Any = None,
+        source: str | None = None,
+        *,
+        key: str | None = None,
+        **options: Any,
+    ) -> bool:
+        """
+        Removes one entry, given either its `key` or the `events`, `source` and options
+        it was built from.
+
+        Returns:
+            bool: Whether an entry was removed
+        """
+        if key is None:
+            if events is None or source is None:
+                raise ValueError("Expected either a key or the events and source")
+            key = fingerprint(events, source, **options)
+        path = self._path(key)
+        existed = path.exists()
+        path.unlink(missing_ok=True)
+        return existed
+
+    def clear(self) -> None:
+        """Removes every entry."""
+        for path in self.entries():
+            path.unlink(missing_ok=True)
+
+
+__all__ = [
+    "TreeCache",
+    "fingerprint",
+]
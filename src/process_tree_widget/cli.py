@@ -0,0 +1,357 @@
+import argparse
+import hashlib
+import json
+import os
+import re
+import sys
+import time
+
+import ibis
+import pyarrow as pa
+
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from process_tree_widget.forest import _to_ipc, partition_table
+from process_tree_widget.stats import Stats
+from process_tree_widget.tree import ProcessTree
+from process_tree_widget.utils import prepare_events
+from typing import Any, Dict, Final, Iterator, List, NamedTuple, Sequence, Set, Tuple
+
+# Output name -> file suffix, see `write_outputs`
+OUTPUTS: Final[Dict[str, str]] = {
+    "json": ".json",
+    "text": ".txt",
+    "arrow": ".arrow",
+}
+
+SUMMARY_FILE: Final[str] = "summary.jsonl"
+
+# Host column added to events without one, see `run`
+HOST_COLUMN: Final[str] = "_host"
+
+
+class Options(NamedTuple):
+    """How each host's tree is built and written, see `build_host`."""
+
+    directory: str
+    outputs: Sequence[str] = ("json", "text")
+    reconcile: bool = False
+
+
+def read_events(paths: Sequence[str], input_format: str | None = None) -> ibis.Table:
+    """
+    Reads raw events from Parquet files or a Delta table with ibis' default backend.
+
+    Args:
+        paths: Parquet files, directories or globs, or one Delta table directory
+        input_format: "parquet" or "delta", by default "delta" for a directory with a
+            `_delta_log` and "parquet" otherwise
+    """
+    if input_format is None:
+        delta = len(paths) == 1 and os.path.isdir(os.path.join(paths[0], "_delta_log"))
+        input_format = "delta" if delta else "parquet"
+    if input_format == "parquet":
+        return ibis.read_parquet(list(paths))
+    if input_format == "delta":
+        if len(paths) != 1:
+            raise ValueError("Only one Delta table can be read at a time")
+        return ibis.read_delta(paths[0])
+    raise ValueError(
+        f"Unknown input format '{input_format}'. Expected 'parquet' or 'delta'."
+    )
+
+
+def file_stem(host: str) -> str:
+    """
+    The file name of a host's outputs: anything but letters, digits, `.` and `-` is
+    `_`. When something was replaced, a short hash of the host is appended, so that
+    e.g. `a b` and `a/b` don't share their files.
+    """
+    stem = re.sub(r"[^\w.-]", "_", host)
+    if stem != host:
+        stem += "-" + hashlib.sha1(host.encode()).hexdigest()[:8]
+    return stem
+
+
+def summarize_tree(tree: ProcessTree) -> Dict[str, Any]:
+    """The numbers `summary.jsonl` has for each host."""
+    first, last = tree.get_first_and_last_processes()
+    return {
+        "processes": len(tree) - 1,
+        "roots": tree.child_count(tree.root),
+        "depth": len(tree.levels(depth=len(tree))) - 1,
+        "first": None if first is None else str(first.target_process_creation_time),
+        "last": None if last is None else str(last.target_process_creation_time),
+    }
+
+
+def write_outputs(tree: ProcessTree, host: str, options: Options) -> None:
+    """
+    Writes a host's tree to `options.directory`, one file per output:
+
+    - `json`: the dependentree list, see `ProcessTree.create_dependentree_format`
+    - `text`: `ProcessTree.display`
+    - `arrow`: a snapshot that `ProcessTree.open` memory-maps, see `ProcessTree.save`
+    """
+    path = os.path.join(options.directory, file_stem(host))
+    if "json" in options.outputs:
+        with open(path + OUTPUTS["json"], "w") as f:
+            json.dump(tree.create_dependentree_format(), f, default=str)
+    if "text" in options.outputs:
+        with open(path + OUTPUTS["text"], "w") as f:
+            f.write(tree.display())
+    if "arrow" in options.outputs:
+        tree.save(path + OUTPUTS["arrow"])
+
+
+def build_host(host: str, table: pa.Table, options: Options) -> Dict[str, Any]:
+    """
+    Builds one host's tree from its events and writes its outputs.
+
+    Returns:
+        dict: The host's line of `summary.jsonl`
+    """
+    start = time.perf_counter()
+    tree = ProcessTree.from_arrow(table, options.reconcile)
+    write_outputs(tree, host, options)
+    return {
+        "host": host,
+        "file": file_stem(host),
+        "rows": table.num_rows,
+        **summarize_tree(tree),
+        "seconds": round(time.perf_counter() - start, 6),
+    }
+
+
+def _build_host_ipc(host: str, data: pa.Buffer, options: Options) -> Dict[str, Any]:
+    # Runs in a worker process, so it has to be importable at module level
+    return build_host(host, pa.ipc.open_stream(data).read_all(), options)
+
+
+def host_batches(
+    events: ibis.Table, partition_by: str, hosts_per_batch: int, stats: Stats
+) -> Iterator[List[Tuple[str, pa.Table]]]:
+    """
+    Fetches the prepared events a few hosts at a time, so only one batch of hosts is
+    held in memory, and splits each batch per host (see `forest.partition_table`).
+    Rows are ordered by `Timestamp` within each host.
+    """
+    column = events[partition_by]
+    with stats.stage("hosts") as stage:
+        hosts = events.select(column).distinct().order_by(column).to_pyarrow()
+        hosts = hosts.column(0).to_pylist()
+        stage.rows = len(hosts)
+
+    for offset in range(0, len(hosts), hosts_per_batch):
+        batch = hosts[offset : offset + hosts_per_batch]
+        names = [host for host in batch if host is not None]
+        condition = column.isin(names)
+        if len(names) < len(batch):
+            condition |= column.isnull()
+        with stats.stage("query") as stage:
+            table = events.filter(condition).order_by("Timestamp").to_pyarrow()
+            stage.rows = table.num_rows
+        yield partition_table(table, partition_by)
+
+
+def run(
+    events: ibis.Table,
+    source: str,
+    options: Options,
+    partition_by: str | None = None,
+    max_workers: int | None = None,
+    hosts_per_batch: int = 256,
+    host: str = "image",
+) -> Stats:
+    """
+    Builds and writes one tree per host across a pool of worker processes, see
+    `main`. Each host's events are sent to a worker, which builds the tree and
+    writes its outputs itself, so only summaries come back; at most a few hosts per
+    worker are queued at a time. The summaries are appended to `summary.jsonl` as
+    hosts finish.
+
+    Args:
+        events: The raw events
+        source: One of "mde" or "volatility"
+        options: Where and what to write
+        partition_by: The column naming each row's host (or memory image), by
+            default "DeviceName", or "ImageId" for Volatility. Volatility output of
+            a single image, without an "ImageId" column, is built as one host
+        max_workers: Number of worker processes, the number of CPUs by default; with
+            1 the trees are built in this process
+        hosts_per_batch: Hosts fetched from the backend per query
+        host: Name of the host, for events built as one host
+
+    Returns:
+        Stats: The `hosts` and `query` stages and one `batch` stage for the whole
+        run, whose `rows` is the number of event rows
+
+    Raises:
+        ValueError: If the partition column is unknown, or two hosts would be
+            written to the same files (see `file_stem`), before either is overwritten
+    """
+    volatility = source.lower() == "volatility"
+    if partition_by is None:
+        partition_by = "ImageId" if volatility else "DeviceName"
+        if volatility and partition_by not in events.columns:
+            partition_by = None
+    if partition_by is not None and partition_by not in events.columns:
+        raise ValueError(
+            f"Unknown partition column '{partition_by}'. "
+            f"Expected one of {list(events.columns)}."
+        )
+
+    image_column = partition_by if volatility else None
+    prepared = prepare_events(events, source, image_column)
+    if partition_by is None:
+        partition_by = HOST_COLUMN
+        prepared = prepared.mutate(**{HOST_COLUMN: ibis.literal(host)})
+    os.makedirs(options.directory, exist_ok=True)
+    max_workers = max_workers or os.cpu_count() or 1
+
+    stats = Stats()
+    with stats.stage("batch", 0) as total, open(
+        os.path.join(options.directory, SUMMARY_FILE), "w"
+    ) as summary:
+
+        def report(result: Dict[str, Any]) -> None:
+            summary.write(json.dumps(result) + "\n")
+            total.rows += result["rows"]
+
+        # Lowercased, for case-insensitive file systems
+        stems: Dict[str, str] = {}
+
+        def claim(host: str) -> None:
+            stem = file_stem(host)
+            other = stems.setdefault(stem.lower(), host)
+            if other != host:
+                raise ValueError(
+                    f"Hosts '{other}' and '{host}' would both be written to "
+                    f"'{stem}'. Expected distinct file names."
+                )
+
+        batches = host_batches(prepared, partition_by, hosts_per_batch, stats)
+        if max_workers == 1:
+            for batch in batches:
+                for host, table in batch:
+                    claim(host)
+                    report(build_host(host, table, options))
+            return stats
+
+        pending: Set[Future] = set()
+        with ProcessPoolExecutor(max_workers) as executor:
+            for batch in batches:
+                for host, table in batch:
+                    claim(host)
+                    while len(pending) >= 2 * max_workers:
+                        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                        for future in done:
+                            report(future.result())
+                    pending.add(
+                        executor.submit(_build_host_ipc, host, _to_ipc(table), options)
+                    )
+            for future in wait(pending).done:
+                report(future.result())
+
+    return stats
+
+
+def throughput(stats: Stats) -> str:
+    """One line with the hosts, rows and time of a `run`, and their rates."""
+    batch = stats["batch"]
+    hosts = sum(stage.rows or 0 for stage in stats if stage.name == "hosts")
+    rows = batch.rows or 0
+    seconds = max(batch.seconds, 1e-9)
+    return (
+        f"{hosts} hosts, {rows} rows in {batch.seconds:.2f}s: "
+        f"{hosts / seconds:.1f} hosts/s, {rows / seconds:.0f} rows/s"
+    )
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    """
+    Console entry point: builds one process tree per host from Parquet or Delta
+    events and writes them to a directory, without a notebook.
+
+    Example:
+    ```
+        process-tree events/*.parquet --source mde --output trees/ --workers 8
+    ```
+    """
+    parser = argparse.ArgumentParser(
+        prog="process-tree",
+        description="Build one process tree per host and write them to a directory.",
+    )
+    parser.add_argument("inputs", nargs="+", help="Parquet files or globs, or a Delta table")
+    parser.add_argument("--source", required=True, help='"mde" or "volatility"')
+    parser.add_argument("--output", "-o", required=True, help="Output directory")
+    parser.add_argument(
+        "--input-format",
+        choices=["parquet", "delta"],
+        help="Detected from the inputs by default",
+    )
+    parser.add_argument(
+        "--partition-by",
+        default=None,
+        help='Host column, "DeviceName" by default ("ImageId" for volatility, '
+        "without which a single image is built as one host)",
+    )
+    parser.add_argument(
+        "--format",
+        "-f",
+        dest="outputs",
+        action="append",
+        choices=list(OUTPUTS),
+        help="Output to write per host, repeatable; json and text by default",
+    )
+    parser.add_argument("--workers", "-j", type=int, default=None, help="Worker processes")
+    parser.add_argument(
+        "--hosts-per-batch", type=int, default=256, help="Hosts fetched per query"
+    )
+    parser.add_argument(
+        "--reconcile",
+        action="store_true",
+        help="Build with ProcessTree.build_tree_reconciled",
+    )
+    args = parser.parse_args(argv)
+
+    # Events without a host column are named after the input
+    name = os.path.basename(os.path.normpath(args.inputs[0]))
+    host = os.path.splitext(name)[0] if len(args.inputs) == 1 else "image"
+
+    options = Options(args.output, args.outputs or ["json", "text"], args.reconcile)
+    try:
+        events = read_events(args.inputs, args.input_format)
+        stats = run(
+            events,
+            args.source,
+            options,
+            partition_by=args.partition_by,
+            max_workers=args.workers,
+            hosts_per_batch=args.hosts_per_batch,
+            host=host,
+        )
+    except ValueError as error:
+        parser.error(str(error))
+
+    print(throughput(stats), file=sys.stderr)
+    return 0
+
+
+__all__ = [
+    "HOST_COLUMN",
+    "OUTPUTS",
+    "Options",
+    "build_host",
+    "file_stem",
+    "host_batches",
+    "main",
+    "read_events",
+    "run",
+    "summarize_tree",
+    "throughput",
+    "write_outputs",
+]
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,176 @@
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from process_tree_widget.forest import ProcessForest
+from process_tree_widget.tree import ProcessTree
+from typing import Dict, Final, List, Tuple
+
+
+# Output column -> (input column, pyarrow hash aggregate function[, options]). An
+# empty input column list with "count_all" counts the rows.
+Aggregations = Dict[str, Tuple]
+
+# DLLs loaded from below these (lowercased) prefixes count as system DLLs
+SYSTEM_PREFIXES: Final[Tuple[str, ...]] = ("\\systemroot\\", "c:\\windows\\")
+
+# Foreign addresses of sockets that are not talking to a remote host
+LOCAL_ADDRESSES: Final[Tuple[str, ...]] = ("", "*", "0.0.0.0", "::", "127.0.0.1", "::1")
+
+
+def summarize(
+    table: pa.Table,
+    aggregations: Aggregations,
+    key: str = "PID",
+    partition_column: str | None = None,
+) -> pa.Table:
+    """
+    Aggregates a plugin table into one row per process id, in one vectorized
+    group-by, for `ProcessTree.add_attributes`.
+
+    Example:
+    ```python
+        summary = summarize(handles, {"HandleCount": ([], "count_all")})
+        tree.add_attributes(summary)
+    ```
+
+    Args:
+        table: Rows with a process id column, e.g. Volatility plugin output
+        aggregations: Output column -> (input column, aggregate function[, options])
+        key: Name of the process id column
+        partition_column: Also group by this column, for rows from several devices
+            or images (see `ProcessForest.add_attributes`)
+
+    Returns:
+        pa.Table: The `key` (and `partition_column`) and one column per aggregation
+    """
+    keys = [key] if partition_column is None else [key, partition_column]
+    grouped = table.group_by(keys, use_threads=False).aggregate(
+        list(aggregations.values())
+    )
+    # The aggregates are named after their input column and function, rename them
+    positions = [i for i, name in enumerate(grouped.column_names) if name not in keys]
+    columns = {name: grouped.column(i) for name, i in zip(aggregations, positions)}
+    return pa.table({**{name: grouped.column(name) for name in keys}, **columns})
+
+
+def _flag(values: pa.ChunkedArray) -> pa.ChunkedArray:
+    # Booleans as 0/1, so they can be summed
+    return pc.fill_null(values, False).cast(pa.int64())
+
+
+def summarize_dlllist(
+    table: pa.Table, partition_column: str | None = None
+) -> pa.Table:
+    """
+    Summarizes `windows.dlllist.DllList` output per process:
+
+    - `DllCount`: loaded DLLs
+    - `NonSystemDllCount`: DLLs loaded from outside the Windows directory
+    - `UnsignedDllCount`: unsigned DLLs, only when the table has a boolean `Signed`
+      column (DllList itself doesn't check signatures)
+    """
+    path = pc.utf8_lower(pc.fill_null(table.column("Path"), ""))
+    system = pc.starts_with(path, SYSTEM_PREFIXES[0])
+    for prefix in SYSTEM_PREFIXES[1:]:
+        system = pc.or_(system, pc.starts_with(path, prefix))
+    table = table.append_column("NonSystemDll", _flag(pc.invert(system)))
+
+    aggregations: Aggregations = {
+        "DllCount": ([], "count_all"),
+        "NonSystemDllCount": ("NonSystemDll", "sum"),
+    }
+    if "Signed" in table.column_names:
+        unsigned = _flag(pc.invert(table.column("Signed")))
+        table = table.append_column("UnsignedDll", unsigned)
+        aggregations["UnsignedDllCount"] = ("UnsignedDll", "sum")
+
+    return summarize(table, aggregations, partition_column=partition_column)
+
+
+def summarize_netscan(
+    table: pa.Table, partition_column: str | None = None
+) -> pa.Table:
+    """
+    Summarizes `windows.netscan.NetScan` output per owning process:
+
+    - `SocketCount`: sockets
+    - `ListeningCount`: listening sockets
+    - `RemoteEndpointCount`: distinct remote `address:port` pairs, leaving out
+      unconnected and loopback sockets
+    - `RemoteEndpoints`: those pairs
+    """
+    address = pc.fill_null(table.column("ForeignAddr"), "")
+    remote = pc.invert(pc.is_in(address, value_set=pa.array(LOCAL_ADDRESSES)))
+    # IPv6 addresses in brackets, so the port stays readable
+    host = pc.if_else(
+        pc.match_substring(address, ":"),
+        pc.binary_join_element_wise("[", address, "]", ""),
+        address,
+    )
+    port = table.column("ForeignPort").cast(pa.string())
+    endpoint = pc.binary_join_element_wise(host, port, ":")
+    table = table.append_column(
+        "RemoteEndpoint", pc.if_else(remote, endpoint, pa.scalar(None, pa.string()))
+    )
+    table = table.append_column(
+        "Listening", _flag(pc.equal(table.column("State"), "LISTENING"))
+    )
+
+    only_valid = pc.CountOptions(mode="only_valid")
+    aggregations: Aggregations = {
+        "SocketCount": ([], "count_all"),
+        "ListeningCount": ("Listening", "sum"),
+        "RemoteEndpointCount": ("RemoteEndpoint", "count_distinct", only_valid),
+        "RemoteEndpoints": ("RemoteEndpoint", "distinct", only_valid),
+    }
+    return summarize(table, aggregations, partition_column=partition_column)
+
+
+def enrich(
+    tree: ProcessTree,
+    dlllist: pa.Table | None = None,
+    netscan: pa.Table | None = None,
+    partition_column: str | None = None,
+) -> List[str]:
+    """
+    Summarizes Volatility `DllList` and `NetScan` output per process and attaches
+    the summaries to the tree's nodes, so looking up or filtering on them doesn't
+    query the plugin tables again. See `summarize_dlllist`, `summarize_netscan` and
+    `ProcessTree.add_attributes`.
+
+    Args:
+        tree: The tree to enrich
+        dlllist: `windows.dlllist.DllList` rows
+        netscan: `windows.netscan.NetScan` rows
+        partition_column: The column naming each row's image, for a `ProcessForest`
+            built from several images
+
+    Returns:
+        list[str]: Names of the attributes that were added
+    """
+    if partition_column is not None and not isinstance(tree, ProcessForest):
+        raise ValueError("partition_column can only be used with a ProcessForest")
+
+    summaries = []
+    if dlllist is not None:
+        summaries.append(summarize_dlllist(dlllist, partition_column))
+    if netscan is not None:
+        summaries.append(summarize_netscan(netscan, partition_column))
+
+    names = []
+    for summary in summaries:
+        if isinstance(tree, ProcessForest):
+            names.extend(tree.add_attributes(summary, partition_column=partition_column))
+        else:
+            names.extend(tree.add_attributes(summary))
+    return names
+
+
+__all__ = [
+    "LOCAL_ADDRESSES",
+    "SYSTEM_PREFIXES",
+    "enrich",
+    "summarize",
+    "summarize_dlllist",
+    "summarize_netscan",
+]
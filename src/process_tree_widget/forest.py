@@ -0,0 +1,418 @@
+import json
+import os
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from process_tree_widget.arrow import PROCESS_COLUMNS
+from process_tree_widget.tree import (
+    Process,
+    ProcessTree,
+    _from_arrow,
+    _parse_identifier,
+    _single_chunk,
+    _to_array,
+    _Column,
+    _to_ns,
+    _view_arrow,
+)
+from typing import Dict, Final, Hashable, Iterable, Iterator, List, Self, Tuple, cast
+
+
+def _build_partition(table: pa.Table, reconcile: bool = False) -> ProcessTree:
+    return ProcessTree.from_arrow(table, reconcile)
+
+
+def _to_ipc(table: pa.Table) -> pa.Buffer:
+    """
+    Serializes the process columns of a table for a worker process.
+
+    Pickling a slice would send the buffers of the whole table, the IPC format only
+    writes the sliced range.
+    """
+    table = table.select([name for name in PROCESS_COLUMNS if name in table.column_names])
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue()
+
+
+def _build_partition_ipc(data: pa.Buffer, reconcile: bool = False) -> ProcessTree:
+    # Runs in a worker process, so it has to be importable at module level
+    return _build_partition(pa.ipc.open_stream(data).read_all(), reconcile)
+
+
+def partition_table(table: pa.Table, partition_by: str) -> List[Tuple[str, pa.Table]]:
+    """
+    Splits a table into one zero-copy slice per distinct value of a column.
+
+    Rows keep their relative order within each partition, so building a tree from a
+    slice gives the same tree as building it from the rows of that partition alone.
+
+    Args:
+        table: Process creation events in the unified schema
+        partition_by: Name of the column to split on (e.g. `DeviceName`)
+
+    Returns:
+        list[tuple[str, pa.Table]]: (partition name, rows) pairs, sorted by name
+    """
+    if partition_by not in table.column_names:
+        raise ValueError(
+            f"Unknown partition column '{partition_by}'. "
+            f"Expected one of {table.column_names}."
+        )
+
+    # sort_indices is stable, so the original order is kept inside each partition
+    table = table.take(pc.sort_indices(table, [(partition_by, "ascending")]))
+
+    partitions = []
+    offset = 0
+    for entry in pc.value_counts(table.column(partition_by)).to_pylist():
+        value, count = entry["values"], entry["counts"]
+        name = ProcessForest.MISSING_PARTITION if value is None else str(value)
+        partitions.append((name, table.slice(offset, count)))
+        offset += count
+    return partitions
+
+
+class ProcessForest(ProcessTree):
+    """A ProcessTree holding one process tree per partition, e.g. per device.
+
+    Process identifiers (`pid|creation_time`) only identify a process within one
+    device, so the partitions are built independently, in parallel worker processes,
+    and merged under one root node per partition:
+
+    ```plain
+        <root>
+        ├── client-01.corp.net
+        │   └── MsSense.exe (3436)
+        │       └── ...
+        └── client-02.corp.net
+            └── ...
+    ```
+
+    Node identifiers are namespaced by partition as `<partition>/<pid>|<creation_time>`,
+    and a partition root's identifier is the partition name itself. Internally the
+    node keys are `(partition, pid, creation_time)` integers. Everything else
+    behaves like a single ProcessTree, so the forest can be passed wherever a tree is
+    expected, including `ProcessTreeWidget`.
+    """
+
+    MISSING_PARTITION: Final[str] = "<unknown>"
+    SEPARATOR: Final[str] = "/"
+
+    def __init__(self, partition_by: str = "DeviceName"):
+        super().__init__()
+        self.partition_by = partition_by
+
+        # Partition of each node, -1 for `<root>`
+        self._partition: _Column = array("i", [-1])
+        self._partitions: List[str] = []
+        self._partition_roots: Dict[str, int] = {}
+
+        # Partition that `_key` and `_append` insert into
+        self._current: int = -1
+
+    @classmethod
+    def from_arrow(  # type: ignore[override]
+        cls,
+        table: pa.Table,
+        partition_by: str = "DeviceName",
+        max_workers: int | None = None,
+        reconcile: bool = False,
+    ) -> "ProcessForest":
+        """
+        Builds a ProcessForest from a `pyarrow.Table` in the unified schema.
+
+        See `build_forest_from_arrow` for details.
+        """
+        return cls(partition_by).build_forest_from_arrow(table, max_workers, reconcile)
+
+    def build_forest_from_arrow(
+        self, table: pa.Table, max_workers: int | None = None, reconcile: bool = False
+    ) -> Self:
+        """
+        Splits `table` on the partition column, builds the per-partition trees in a
+        `ProcessPoolExecutor` and merges them into this forest, in partition order.
+
+        With a single partition, or `max_workers=1`, the trees are built in this
+        process instead, which avoids the cost of starting workers and of sending
+        the tables and trees between processes.
+
+        Args:
+            table: Process creation events with Target/Acting/Parent process triplets
+            max_workers: Number of worker processes, the number of CPUs by default
+            reconcile: Build each partition with `ProcessTree.build_tree_reconciled`,
+                for rows that are out of order
+
+        Returns:
+            ProcessForest: self, to allow chaining
+        """
+        with self.stats.stage("build_forest_from_arrow", table.num_rows):
+            return self._build_partitions(table, max_workers, reconcile)
+
+    def _build_partitions(
+        self, table: pa.Table, max_workers: int | None, reconcile: bool = False
+    ) -> Self:
+        partitions = partition_table(table, self.partition_by)
+        names = [name for name, _ in partitions]
+        tables = [rows for _, rows in partitions]
+
+        trees: Iterator[ProcessTree]
+        if len(partitions) <= 1 or max_workers == 1:
+            trees = map(partial(_build_partition, reconcile=reconcile), tables)
+            for name, tree in zip(names, trees):
+                self._merge(name, tree)
+            return self
+
+        max_workers = max_workers or os.cpu_count() or 1
+        # Many small devices are sent to the workers in batches
+        chunksize = max(1, len(tables) // (4 * max_workers))
+        with ProcessPoolExecutor(max_workers) as executor:
+            trees = executor.map(
+                partial(_build_partition_ipc, reconcile=reconcile),
+                map(_to_ipc, tables),
+                chunksize=chunksize,
+            )
+            for name, tree in zip(names, trees):
+                self._merge(name, tree)
+
+        return self
+
+    def extend(self, batch: "List | pa.Table") -> List[str]:
+        """
+        Inserts a batch of new process creation events into the forest.
+
+        The batch is split on the partition column and each partition's rows are
+        inserted into that partition's tree, which is created when it is new.
+        See `ProcessTree.extend`.
+        """
+        if isinstance(batch, list):
+            batch = pa.Table.from_pylist(batch)
+
+        self._changed = set()
+        try:
+            with self.stats.stage("extend", batch.num_rows):
+                for name, rows in partition_table(batch, self.partition_by):
+                    if name not in self._partition_roots:
+                        self._changed.add(self._add_partition(name))
+                    self._select(name)
+                    self._insert_table(rows)
+            changed = sorted(self._changed)
+        finally:
+            self._changed = None
+            self._select(None)
+
+        return [self._identifier(index) for index in changed]
+
+    @property
+    def partitions(self) -> List[str]:
+        """The partition names, in node order."""
+        return self._partitions
+
+    def partition_of(self, identifier: str) -> str | None:
+        """Returns the partition a node belongs to, or None for `<root>`."""
+        code = self._partition[self._lookup(identifier)]
+        return self._partitions[code] if code >= 0 else None
+
+    def tree(self, partition: str) -> ProcessTree:
+        """
+        Returns one partition as a standalone ProcessTree with plain identifiers, its
+        nodes in depth-first order.
+        """
+        tree = self.subtree_with_ancestors(partition, num_ancestors=0).to_tree()
+
+        # A placeholder root instead of the partition node, as if built on its own
+        tree.root = ProcessTree.ROOT
+        tree._root_deps = []
+        tree._filename[0] = tree._encode_filename(ProcessTree.ROOT)
+        tree._creation_time[0] = 0
+        tree._nodes = {tree._node_key(i): i for i in range(len(tree))}
+        return tree
+
+    def to_table(self) -> pa.Table:
+        """
+        Returns the node storage as a `pyarrow.Table`, see `ProcessTree.to_table`. The
+        partition of each node is added as a dictionary-encoded `partition` column.
+        """
+        table = super().to_table()
+        codes = pa.array(self._partition, pa.int32())
+        # `<root>` has no partition
+        codes = pc.if_else(pc.less(codes, 0), pa.scalar(None, pa.int32()), codes)
+        partition = pa.DictionaryArray.from_arrays(codes, pa.array(self._partitions, pa.string()))
+        metadata = {
+            **{key.decode(): value.decode() for key, value in table.schema.metadata.items()},
+            "partition_by": self.partition_by,
+            "partition_roots": json.dumps(self._partition_roots),
+        }
+        return table.append_column("partition", partition).replace_schema_metadata(metadata)
+
+    def _load_table(
+        self, table: pa.Table, metadata: Dict[str, str], copy: bool = True
+    ) -> None:
+        super()._load_table(table, metadata, copy)
+        partition = _single_chunk(table.column("partition"))
+        self.partition_by = metadata["partition_by"]
+        self._partitions = partition.dictionary.to_pylist()
+        codes = pc.fill_null(partition.indices, -1)
+        self._partition = (_from_arrow if copy else _view_arrow)("i", codes)
+        if "partition_roots" in metadata:
+            self._partition_roots = json.loads(metadata["partition_roots"])
+        else:
+            self._partition_roots = {
+                self._partitions[self._partition[index]]: index
+                for index in range(1, len(self))
+                if self._is_placeholder(index)
+            }
+
+    def _unmap(self) -> None:
+        if self._mapped is not None:
+            self._partition = _to_array(self._partition)
+        super()._unmap()
+
+    def _placeholders(self) -> List[int]:
+        return [0, *self._partition_roots.values()]
+
+    def _indexed_nodes(self) -> Iterable[int]:
+        # Neither `<root>` nor the partition roots are processes
+        roots = set(self._partition_roots.values())
+        return (node for node in range(1, len(self)) if node not in roots)
+
+    def add_attributes(
+        self, table: pa.Table, key: str = "PID", partition_column: str | None = None
+    ) -> List[str]:
+        """
+        Attaches per-process values to the nodes, see `ProcessTree.add_attributes`.
+
+        Process ids repeat between devices or images, so with `partition_column` a row
+        only matches nodes in the partition it names. Without it, a row goes to the
+        most recent node with its process id in any partition.
+        """
+        if partition_column is None:
+            return super().add_attributes(table, key)
+
+        rows: List[int | None] = [None] * len(self)
+        pids = table.column(key).to_pylist()
+        names = table.column(partition_column).to_pylist()
+        for row, (pid, name) in enumerate(zip(pids, names)):
+            name = ProcessForest.MISSING_PARTITION if name is None else str(name)
+            if name not in self._partition_roots:
+                continue
+            code = self._partition[self._partition_roots[name]]
+            nodes = [
+                node for node in self._pids().get(pid, ()) if self._partition[node] == code
+            ]
+            if nodes:
+                rows[max(nodes, key=self._creation_time.__getitem__)] = row
+        return self._set_attributes(table.drop_columns([key, partition_column]), rows)
+
+    def _add_partition(self, name: str) -> int:
+        self._unmap()
+        code = len(self._partitions)
+        self._partitions.append(name)
+
+        # The partition root is a node without a process, like `<root>`
+        index = super()._append(
+            Process.MISSING_PROCESS_ID,
+            self._encode_filename(name),
+            _to_ns(Process.MISSING_CREATION_TIME),
+            0,
+        )
+        assert isinstance(self._partition, array)
+        self._partition.append(code)
+        self._partition_roots[name] = index
+        self._node_keys()[name] = index
+        return index
+
+    def _select(self, name: str | None) -> None:
+        if name is None:
+            self._current = -1
+        else:
+            self._current = self._partition[self._partition_roots[name]]
+
+    def _merge(self, name: str, tree: ProcessTree) -> None:
+        """Appends a partition's tree below a new partition root."""
+        root = self._add_partition(name)
+        code = self._partition[root]
+        size = len(tree) - 1
+
+        # Node i of `tree` (0 being its `<root>`) ends up at root + i
+        codes = [self._encode_filename(filename) for filename in tree._filenames]
+        parents, pids, times, filenames = self._node_arrays()
+        parents.extend(array("q", (root + p for p in tree._parent[1:])))
+        pids.extend(tree._pid[1:])
+        times.extend(tree._creation_time[1:])
+        filenames.extend(array("i", (codes[c] for c in tree._filename[1:])))
+        assert isinstance(self._partition, array)
+        self._partition.extend(array("i", [code]) * size)
+
+        # The partition's keys are (pid, creation_time)
+        self._node_keys().update(
+            ((code, *cast(Tuple[int, int], key)), root + index)
+            for key, index in tree._nodes.items()
+            if index
+        )
+        self._drop_indexes()
+
+    def _is_placeholder(self, index: int) -> bool:
+        # Only `<root>` and the partition roots lack a process id
+        return index == 0 or self._pid[index] == Process.MISSING_PROCESS_ID
+
+    def _identifier(self, index: int) -> str:
+        if index == 0:
+            return self.root
+        name = self._partitions[self._partition[index]]
+        if self._is_placeholder(index):
+            return name
+        return name + ProcessForest.SEPARATOR + super()._identifier(index)
+
+    def _tag(self, index: int) -> str:
+        if index and self._is_placeholder(index):
+            return self._partitions[self._partition[index]]
+        return super()._tag(index)
+
+    def _append(self, pid: int, filename: int, creation_time: int, parent: int) -> int:
+        # Processes without a known parent go below their partition's root
+        if parent == 0:
+            parent = self._partition_roots[self._partitions[self._current]]
+        index = super()._append(pid, filename, creation_time, parent)
+        assert isinstance(self._partition, array)
+        self._partition.append(self._current)
+        return index
+
+    def _key(self, pid: int, creation_time: int) -> Hashable:
+        return (self._current, pid, creation_time)
+
+    def _node_key(self, index: int) -> Hashable:
+        if self._is_placeholder(index):
+            return self._identifier(index)
+        return (self._partition[index], self._pid[index], self._creation_time[index])
+
+    def _parse(self, identifier: str) -> Hashable:
+        if identifier == self.root or identifier in self._partition_roots:
+            return identifier
+        name, _, process = identifier.rpartition(ProcessForest.SEPARATOR)
+        code = self._partition[self._partition_roots[name]]
+        return (code, *_parse_identifier(process))
+
+
+def build_forest(
+    table: pa.Table,
+    partition_by: str = "DeviceName",
+    max_workers: int | None = None,
+    reconcile: bool = False,
+) -> ProcessForest:
+    """
+    Builds one process tree per value of `partition_by`, in parallel, merged under
+    per-partition roots. Shorthand for `ProcessForest.from_arrow`.
+    """
+    return ProcessForest.from_arrow(table, partition_by, max_workers, reconcile)
+
+
+__all__ = [
+    "ProcessForest",
+    "build_forest",
+    "partition_table",
+]
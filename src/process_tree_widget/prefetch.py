@@ -0,0 +1,137 @@
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from process_tree_widget.tree import Process, ProcessTree
+from typing import Any, Callable, List
+
+
+class Prefetcher:
+    """
+    Runs a per-process lookup (e.g. the ibis queries for a process's children, DLLs
+    or network connections) for the selected node and, speculatively, its parent,
+    children and siblings, in a thread pool. Results are kept in a bounded LRU, so
+    moving to a neighbouring node usually finds its result ready.
+
+    The lookup is called with the node's `Process` and runs on a worker thread;
+    backends that can't be queried from several threads at once should use
+    `max_workers=1`.
+
+    Example:
+    ```python
+        def modules(process: Process):
+            return dlllist.filter(dlllist.PID == process.target_process_id).to_pyarrow()
+
+        prefetcher = Prefetcher(modules)
+        prefetcher.prefetch(tree, selected)
+        ...
+        table = prefetcher.get(tree, selected)
+    ```
+    """
+
+    def __init__(
+        self,
+        function: Callable[[Process], Any],
+        max_entries: int = 256,
+        max_workers: int = 4,
+        max_neighbours: int = 32,
+    ):
+        """
+        Args:
+            function: The lookup, called with the node's `Process`
+            max_entries: Results (finished or pending) to keep, least recently used
+                are dropped first
+            max_workers: Threads running lookups
+            max_neighbours: Children and siblings to prefetch per selection, each
+        """
+        self.function = function
+        self.max_entries = max_entries
+        self.max_neighbours = max_neighbours
+        self._executor = ThreadPoolExecutor(max_workers, thread_name_prefix="prefetch")
+        self._results: OrderedDict[str, Future] = OrderedDict()
+
+    def __contains__(self, identifier: object) -> bool:
+        return identifier in self._results
+
+    def __len__(self) -> int:
+        return len(self._results)
+
+    def neighbours(self, tree: ProcessTree, identifier: str) -> List[str]:
+        """
+        Returns the nodes worth prefetching after `identifier` was selected, most
+        likely next first: its parent, children and siblings. Nodes that aren't
+        processes (e.g. `<root>`) are left out.
+        """
+        path = tree.path_to_root(identifier)
+        parent = path[1] if len(path) > 1 else None
+        nodes = [] if parent is None else [parent]
+        nodes.extend(tree.children(identifier)[: self.max_neighbours])
+        if parent is not None:
+            siblings = [node for node in tree.children(parent) if node != identifier]
+            nodes.extend(siblings[: self.max_neighbours])
+        return [node for node in nodes if tree.get_process(node) is not None]
+
+    def _submit(self, tree: ProcessTree, identifier: str) -> Future | None:
+        future = self._results.get(identifier)
+        if future is not None:
+            self._results.move_to_end(identifier)
+            return future
+
+        process = tree.get_process(identifier)
+        if process is None:
+            return None
+        future = self._executor.submit(self.function, process)
+        self._results[identifier] = future
+        while len(self._results) > self.max_entries:
+            _, dropped = self._results.popitem(last=False)
+            dropped.cancel()
+        return future
+
+    def prefetch(self, tree: ProcessTree, identifier: str) -> None:
+        """
+        Starts the lookups for a selected node and its neighbours, without waiting
+        for them. Lookups still queued for an earlier selection are cancelled first,
+        so the workers move on to the new one.
+        """
+        if identifier not in tree:
+            return
+        wanted = [identifier, *self.neighbours(tree, identifier)]
+        keep = set(wanted)
+        for name, future in list(self._results.items()):
+            if name not in keep and future.cancel():
+                del self._results[name]
+        for name in wanted:
+            self._submit(tree, name)
+
+    def get(self, tree: ProcessTree, identifier: str, timeout: float | None = None) -> Any:
+        """
+        Returns the lookup's result for a node, waiting for it if it is still running
+        (or starting it on a miss). A lookup that failed raises its exception here,
+        and is dropped so the next call retries it.
+
+        Raises:
+            KeyError: If the node is not a process in the tree
+        """
+        future = self._submit(tree, identifier)
+        if future is None:
+            raise KeyError(identifier)
+        try:
+            return future.result(timeout)
+        except Exception:
+            if future.done() and self._results.get(identifier) is future:
+                del self._results[identifier]
+            raise
+
+    def clear(self) -> None:
+        """Drops every result and cancels the lookups that haven't started."""
+        for future in self._results.values():
+            future.cancel()
+        self._results.clear()
+
+    def shutdown(self) -> None:
+        """Stops the worker threads, after the running lookups finish."""
+        self.clear()
+        self._executor.shutdown(wait=False)
+
+
+__all__ = [
+    "Prefetcher",
+]
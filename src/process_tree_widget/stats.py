@@ -0,0 +1,212 @@
+import logging
+import time
+import tracemalloc
+
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Callable, Deque, Dict, Final, Iterator, List, NamedTuple
+
+logger = logging.getLogger("process_tree_widget.stats")
+
+
+class StageStats(NamedTuple):
+    """One run of a pipeline stage, see `Stats.stage`."""
+
+    name: str
+    # Wall clock start, in epoch nanoseconds, and duration
+    start_ns: int
+    seconds: float
+    # Rows or nodes the stage handled, when it has a natural count
+    rows: int | None
+    # Peak size of the Python heap during the stage, only when tracemalloc is
+    # tracing
+    python_peak: int | None
+    # Growth of the memory allocated by Arrow over the stage
+    arrow_bytes: int
+
+
+Hook = Callable[[StageStats], None]
+
+# Called with every recorded stage, see `add_hook`
+_HOOKS: List[Hook] = []
+
+
+def add_hook(hook: Hook) -> Hook:
+    """
+    Registers a function that is called with every stage recorded by any `Stats`,
+    e.g. to export them as metrics or trace spans (see `opentelemetry_hook`).
+    Hooks run on the thread that ran the stage and should be quick; exceptions
+    they raise are logged and otherwise ignored.
+
+    Returns:
+        The hook, so this can be used as a decorator
+    """
+    _HOOKS.append(hook)
+    return hook
+
+
+def remove_hook(hook: Hook) -> None:
+    """Unregisters a hook added with `add_hook`."""
+    _HOOKS.remove(hook)
+
+
+def opentelemetry_hook(tracer: Any = None) -> Hook:
+    """
+    Returns a hook (see `add_hook`) that reports each stage as an OpenTelemetry
+    span, with the row count and memory as attributes. Needs `opentelemetry-api`.
+
+    Args:
+        tracer: The tracer to use, by default the global tracer for this package
+    """
+    if tracer is None:
+        from opentelemetry import trace
+
+        tracer = trace.get_tracer("process_tree_widget")
+
+    def hook(stage: StageStats) -> None:
+        attributes = {
+            key: value
+            for key, value in stage._asdict().items()
+            if key not in ("name", "start_ns") and value is not None
+        }
+        span = tracer.start_span(
+            stage.name, start_time=stage.start_ns, attributes=attributes
+        )
+        span.end(end_time=stage.start_ns + int(stage.seconds * 1e9))
+
+    return hook
+
+
+class _Stage:
+    """What a running stage can fill in, see `Stats.stage`."""
+
+    def __init__(self, rows: int | None) -> None:
+        self.rows = rows
+        self.python_peak = 0
+
+
+# Stages in progress, on any thread. The tracemalloc peak is global, so before it is
+# reset for a new stage it is folded into the stages that are still running
+_RUNNING: List[_Stage] = []
+
+
+def _fold_peak() -> None:
+    peak = tracemalloc.get_traced_memory()[1]
+    for stage in _RUNNING:
+        stage.python_peak = max(stage.python_peak, peak)
+
+
+class Stats:
+    """
+    Per-stage wall time, row counts and memory of a pipeline, e.g. building a tree
+    and sending it to the frontend. Stages are recorded with `stage`, kept in the
+    order they finished (the most recent `max_stages`), logged at DEBUG level to the
+    `process_tree_widget.stats` logger and passed to the hooks from `add_hook`.
+
+    Stages can be nested, e.g. a build that contains a query. The Python heap peak
+    is only measured while `tracemalloc` is tracing (e.g. after
+    `tracemalloc.start()`), which slows the stages down.
+
+    Example:
+    ```python
+        stats = Stats()
+        with stats.stage("fetch") as stage:
+            table = events.to_pyarrow()
+            stage.rows = table.num_rows
+        stats.summary()
+    ```
+    """
+
+    MAX_STAGES: Final[int] = 1000
+
+    def __init__(self, max_stages: int = MAX_STAGES):
+        self.stages: Deque[StageStats] = deque(maxlen=max_stages)
+
+    def __len__(self) -> int:
+        return len(self.stages)
+
+    def __iter__(self) -> Iterator[StageStats]:
+        return iter(self.stages)
+
+    def __getitem__(self, name: str) -> StageStats:
+        """The most recent run of the stage called `name`."""
+        for stage in reversed(self.stages):
+            if stage.name == name:
+                return stage
+        raise KeyError(name)
+
+    def __repr__(self) -> str:
+        return f"Stats({', '.join(f'{s.name}={s.seconds:.3f}s' for s in self.stages)})"
+
+    @contextmanager
+    def stage(self, name: str, rows: int | None = None) -> Iterator[_Stage]:
+        """
+        Records the code in the `with` block as a stage. The yielded object's `rows`
+        can be set inside the block, once the count is known. A stage that raises is
+        recorded as well.
+
+        Args:
+            name: Name of the stage
+            rows: Rows or nodes the stage handles, if known up front
+        """
+        import pyarrow as pa
+
+        running = _Stage(rows)
+        tracing = tracemalloc.is_tracing()
+        if tracing:
+            _fold_peak()
+            tracemalloc.reset_peak()
+        _RUNNING.append(running)
+        arrow = pa.total_allocated_bytes()
+        start_ns = time.time_ns()
+        start = time.perf_counter()
+        try:
+            yield running
+        finally:
+            seconds = time.perf_counter() - start
+            if tracing:
+                _fold_peak()
+            _RUNNING.remove(running)
+            self.record(
+                StageStats(
+                    name=name,
+                    start_ns=start_ns,
+                    seconds=seconds,
+                    rows=running.rows,
+                    python_peak=running.python_peak if tracing else None,
+                    arrow_bytes=pa.total_allocated_bytes() - arrow,
+                )
+            )
+
+    def record(self, stage: StageStats) -> None:
+        """Adds a finished stage and reports it to the logger and hooks."""
+        self.stages.append(stage)
+        logger.debug(
+            "%s: %.3fs, %s rows, python peak %s, arrow %+d bytes",
+            stage.name,
+            stage.seconds,
+            stage.rows,
+            stage.python_peak,
+            stage.arrow_bytes,
+        )
+        for hook in list(_HOOKS):
+            try:
+                hook(stage)
+            except Exception:
+                logger.exception("Stats hook %r failed", hook)
+
+    def summary(self) -> List[Dict[str, Any]]:
+        """The recorded stages as dicts, oldest first, e.g. for a DataFrame."""
+        return [stage._asdict() for stage in self.stages]
+
+    def clear(self) -> None:
+        self.stages.clear()
+
+
+__all__ = [
+    "StageStats",
+    "Stats",
+    "add_hook",
+    "opentelemetry_hook",
+    "remove_hook",
+]
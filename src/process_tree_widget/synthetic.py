@@ -0,0 +1,251 @@
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from datetime import datetime, timedelta
+from typing import Any, Final, List, Tuple
+
+
+# Process images the generated trees are made of
+FILENAMES: Final[Tuple[str, ...]] = (
+    "services.exe", "svchost.exe", "lsass.exe", "wininit.exe", "winlogon.exe",
+    "explorer.exe", "cmd.exe", "powershell.exe", "conhost.exe", "rundll32.exe",
+    "regsvr32.exe", "msiexec.exe", "taskhostw.exe", "dllhost.exe", "wmiprvse.exe",
+    "SearchIndexer.exe", "MsSense.exe", "SenseIR.exe", "csc.exe", "cvtres.exe",
+    "git.exe", "bash.exe", "python.exe", "chrome.exe", "msedge.exe",
+    "OneDrive.exe", "Teams.exe", "outlook.exe", "winword.exe", "excel.exe",
+    "notepad.exe", "wevtutil.exe", "sc.exe", "net.exe", "whoami.exe",
+)
+
+_START: Final[datetime] = datetime(2025, 1, 1)
+_MAX_DELAY: Final[timedelta] = timedelta(minutes=10)
+
+
+def _arange(size: int) -> pa.Array:
+    # pa.array(range(size)) goes through Python ints, this stays in Arrow
+    ones = pa.repeat(pa.scalar(1, pa.int64()), size)
+    return pc.subtract(pc.cumulative_sum(ones), 1)
+
+
+def _mod(values: pa.Array, divisor: int) -> pa.Array:
+    return pc.subtract(values, pc.multiply(pc.divide(values, divisor), divisor))
+
+
+class _Layout:
+    """
+    Node numbering shared by the generators: nodes are numbered consecutively, tree
+    by tree, and each tree is a complete `fanout`-ary tree of `depth` levels below
+    its root, laid out like a heap. Parents always have a lower number than
+    their children, and so an earlier creation time.
+    """
+
+    def __init__(
+        self, fanout: int, depth: int, pid_reuse: float, total_nodes: int
+    ):
+        if fanout < 1:
+            raise ValueError(f"Invalid fanout {fanout}. Expected at least 1.")
+        if not 0 <= pid_reuse < 1:
+            raise ValueError(f"Invalid pid_reuse {pid_reuse}. Expected 0 <= pid_reuse < 1.")
+
+        self.fanout = fanout
+        self.depth = depth
+        self.tree_size = sum(fanout**level for level in range(depth + 1))
+        # With reuse, process ids repeat every `pid_pool` nodes (with other creation times)
+        self.pid_pool = max(1, round(total_nodes * (1 - pid_reuse)))
+
+    def node(self, tree: pa.Array, local: pa.Array) -> pa.Array:
+        return pc.add(pc.multiply(tree, self.tree_size), local)
+
+    def parent_local(self, local: pa.Array) -> pa.Array:
+        return pc.divide(pc.subtract(local, 1), self.fanout)
+
+    def pid(self, node: pa.Array) -> pa.Array:
+        # Windows process ids are multiples of 4
+        return pc.multiply(pc.add(_mod(node, self.pid_pool), 1), 4)
+
+    def filename(self, node: pa.Array) -> pa.Array:
+        # A multiplicative hash, so siblings get different images
+        codes = _mod(pc.multiply(node, 2654435761), len(FILENAMES))
+        return pa.array(FILENAMES).take(codes)
+
+    def creation_time(self, node: pa.Array, unit: str = "us") -> pa.Array:
+        # One process per millisecond
+        scale = 1000 if unit == "us" else 1
+        start = int((_START - datetime(1970, 1, 1)) / timedelta(milliseconds=1)) * scale
+        return pc.add(pc.multiply(node, scale), start).cast(pa.timestamp(unit))
+
+
+def _delays(size: int, fraction: float, seed: int, unit: str) -> pa.Array:
+    """Random delays up to `_MAX_DELAY` for a `fraction` of the rows, 0 elsewhere."""
+    scale = _MAX_DELAY / timedelta(microseconds=1) / (1 if unit == "us" else 1000)
+    delayed = pc.less(pc.random(size, initializer=seed), fraction)
+    amount = pc.floor(pc.multiply(pc.random(size, initializer=seed + 1), scale))
+    amount = amount.cast(pa.int64())
+    return pc.if_else(delayed, amount, 0).cast(pa.duration(unit))
+
+
+def generate_mde_events(
+    rows: int,
+    fanout: int = 4,
+    depth: int = 6,
+    pid_reuse: float = 0.0,
+    out_of_order: float = 0.0,
+    devices: int = 1,
+    seed: int = 0,
+) -> pa.Table:
+    """
+    Generates a synthetic MDE `DeviceProcessEvents` table, with the columns
+    `prepare_mde_data` uses.
+
+    Every row is the creation of a process at least two levels below a tree root, so
+    it has a full initiating process and initiating parent triplet. Root and first
+    level processes only appear as initiators, like `System` and `smss.exe` do.
+
+    Args:
+        rows: Number of events
+        fanout: Children per process
+        depth: Levels below each tree root, at least 2
+        pid_reuse: Fraction of process ids that are reused by later processes
+        out_of_order: Fraction of events reported up to 10 minutes late, so they
+            arrive after the events of their descendants
+        devices: Number of devices the trees are spread over
+        seed: Seed for the random delays
+
+    Returns:
+        pa.Table: The events, ordered by `ReportId`
+    """
+    if depth < 2:
+        raise ValueError(f"Invalid depth {depth}. Expected at least 2 for MDE events.")
+
+    # Events per tree: every node below the first level
+    per_tree = sum(fanout**level for level in range(2, depth + 1))
+    trees = -(-rows // per_tree)
+    layout = _Layout(fanout, depth, pid_reuse, trees * (per_tree + 1 + fanout))
+
+    event = _arange(rows)
+    tree = pc.divide(event, per_tree)
+    local = pc.add(_mod(event, per_tree), 1 + fanout)
+    acting_local = layout.parent_local(local)
+
+    process = layout.node(tree, local)
+    acting = layout.node(tree, acting_local)
+    parent = layout.node(tree, layout.parent_local(acting_local))
+
+    hosts = pa.array([f"host-{device:04d}.corp.net" for device in range(devices)])
+    creation_time = layout.creation_time(process)
+    reported = pc.add(
+        pc.add(creation_time, pa.scalar(timedelta(milliseconds=0.5))),
+        _delays(rows, out_of_order, seed, "us"),
+    )
+
+    return pa.table(
+        {
+            "Timestamp": reported,
+            "ReportId": pc.add(event, 1),
+            "DeviceName": hosts.take(_mod(tree, devices)),
+            "ActionType": pa.repeat(pa.scalar("ProcessCreated"), rows),
+            "ProcessId": layout.pid(process).cast(pa.int32()),
+            "FileName": layout.filename(process),
+            "ProcessCreationTime": creation_time,
+            "InitiatingProcessId": layout.pid(acting).cast(pa.int32()),
+            "InitiatingProcessFileName": layout.filename(acting),
+            "InitiatingProcessCreationTime": layout.creation_time(acting),
+            "InitiatingProcessParentId": layout.pid(parent).cast(pa.int32()),
+            "InitiatingProcessParentFileName": layout.filename(parent),
+            "InitiatingProcessParentCreationTime": layout.creation_time(parent),
+        }
+    )
+
+
+def generate_volatility_events(
+    rows: int,
+    fanout: int = 4,
+    depth: int = 6,
+    pid_reuse: float = 0.0,
+    out_of_order: float = 0.0,
+    images: int = 1,
+    seed: int = 0,
+) -> pa.Table:
+    """
+    Generates a synthetic Volatility `windows.pstree` table, with the columns
+    `prepare_volatility_data` uses.
+
+    Every row is one process; tree roots have no `_vol_parent_id`. With more than one
+    image, the rows are split evenly over the images in an `ImageId` column, and
+    each image numbers its `_vol_id`s and process ids from the start, as if the
+    outputs of several memory images were concatenated.
+
+    Args:
+        rows: Number of processes
+        fanout: Children per process
+        depth: Levels below each tree root
+        pid_reuse: Fraction of process ids that are reused by later processes
+        out_of_order: Fraction of processes whose `CreateTime` is moved up to 10
+            minutes earlier, possibly before their parent's
+        images: Number of memory images the processes are spread over
+        seed: Seed for the random time shifts
+
+    Returns:
+        pa.Table: The processes, ordered by `ImageId` and `_vol_id`
+    """
+    if images < 1:
+        raise ValueError(f"Invalid images {images}. Expected at least 1.")
+
+    per_image = -(-rows // images)
+    layout = _Layout(fanout, depth, pid_reuse, per_image)
+
+    row = _arange(rows)
+    image = pc.divide(row, per_image)
+    node = _mod(row, per_image)
+    tree = pc.divide(node, layout.tree_size)
+    local = _mod(node, layout.tree_size)
+    is_root = pc.equal(local, 0)
+    parent = pc.if_else(
+        is_root, pa.scalar(None, pa.int64()), layout.node(tree, layout.parent_local(local))
+    )
+
+    create_time = pc.subtract(
+        layout.creation_time(node, "ms"), _delays(rows, out_of_order, seed, "ms")
+    )
+
+    names = pa.array([f"image-{number:04d}.raw" for number in range(images)])
+
+    return pa.table(
+        {
+            "ImageId": names.take(image),
+            "PID": layout.pid(node),
+            "PPID": pc.if_else(is_root, 0, layout.pid(pc.fill_null(parent, 0))),
+            "ImageFileName": layout.filename(node),
+            "CreateTime": create_time,
+            "ExitTime": pa.nulls(rows, pa.timestamp("ms")),
+            "_vol_id": node.cast(pa.uint64()),
+            "_vol_parent_id": parent.cast(pa.uint64()),
+        }
+    )
+
+
+def generate_events(source: str, rows: int, **kwargs: Any) -> pa.Table:
+    """
+    Generates a synthetic events table for `prepare_events`.
+
+    Args:
+        source: One of "mde" or "volatility"
+        rows: Number of rows
+        **kwargs: Passed to `generate_mde_events` or `generate_volatility_events`
+
+    Returns:
+        pa.Table: The events
+    """
+    source_key = source.lower()
+    if source_key == "mde":
+        return generate_mde_events(rows, **kwargs)
+    if source_key == "volatility":
+        return generate_volatility_events(rows, **kwargs)
+    raise ValueError(f"Unknown source '{source}'. Expected 'mde' or 'volatility'.")
+
+
+__all__: List[str] = [
+    "FILENAMES",
+    "generate_events",
+    "generate_mde_events",
+    "generate_volatility_events",
+]
@@ -0,0 +1,146 @@
+from array import array
+from process_tree_widget.tree import ProcessTree, _to_ns
+from typing import Any, Dict, Final, Iterable, List, Tuple
+
+# Resolutions with more (non-empty) buckets than this are not sent to the frontend
+MAX_HISTOGRAM_BUCKETS: Final[int] = 5000
+
+
+def encode_columns(
+    tree: ProcessTree,
+    indices: Iterable[int] | None = None,
+    names_offset: int = 0,
+    child_counts: Iterable[int] | None = None,
+) -> Dict[str, Any]:
+    """
+    Packs the tree into typed-array buffers for the frontend, as an alternative to the
+    list of dicts produced by `ProcessTree.create_dependentree_format`.
+
+    The result holds one buffer per column plus the filename string table:
+
+    - `parent`: Int32Array of parent node indices (-1 for the root)
+    - `pid`: Float64Array of process ids
+    - `time`: Float64Array of creation times in epoch milliseconds (NaN for `<root>`)
+    - `filename`: Int32Array of positions in `names`
+    - `index`: Int32Array of node indices, only present when `indices` is given
+    - `child_count`: Int32Array of children not included in the payload, only
+      present when `child_counts` is given (lazy loading)
+    - `attr:<name>`: Float64Array per numeric attribute (see
+      `ProcessTree.add_attributes`, NaN where a node has none), listed in
+      `attributes`. Other attributes are only sent with the JSON transport.
+
+    Nodes are identified by their index, which the frontend uses as `_name`.
+
+    Args:
+        tree: The tree to encode
+        indices: Only encode these nodes (e.g. a delta), instead of the whole tree
+        names_offset: Only include the string table from this position on, for
+            frontends that already hold the earlier names
+        child_counts: Per encoded node, the number of children still to be loaded
+
+    Returns:
+        dict: JSON-compatible metadata plus `memoryview` buffers
+    """
+    if indices is not None:
+        indices = list(indices)
+
+    columns = tree.node_columns(indices)
+    time = array("d", (ns / 1e6 for ns in columns["creation_time"]))
+
+    if tree.root == ProcessTree.ROOT:
+        # The `<root>` placeholder has no creation time
+        nodes = indices if indices is not None else [0]
+        for position, node in enumerate(nodes):
+            if node == 0:
+                time[position] = float("nan")
+
+    payload: Dict[str, Any] = {
+        "length": len(tree),
+        "placeholder_root": tree.root == ProcessTree.ROOT,
+        "names": list(tree.filenames[names_offset:]),
+        "names_offset": names_offset,
+        "parent": memoryview(array("i", columns["parent"])),
+        "pid": memoryview(array("d", columns["pid"])),
+        "time": memoryview(time),
+        "filename": memoryview(array("i", columns["filename"])),
+    }
+    if indices is not None:
+        payload["index"] = memoryview(array("i", indices))
+    if child_counts is not None:
+        payload["child_count"] = memoryview(array("i", child_counts))
+
+    payload["attributes"] = []
+    for name, values in tree.attribute_columns(indices).items():
+        if not _is_numeric(values.type):
+            continue
+        values = values.cast("float64").fill_null(float("nan"))
+        payload["attributes"].append(name)
+        payload[f"attr:{name}"] = memoryview(array("d", values.to_numpy().tobytes()))
+
+    return payload
+
+
+def encode_histograms(
+    tree: ProcessTree, max_buckets: int = MAX_HISTOGRAM_BUCKETS
+) -> Dict[str, Any]:
+    """
+    Packs the tree's creation time histograms (see `ProcessTree.time_histogram`) for
+    the frontend's time filter, which re-bins them for display instead of binning
+    every node's creation time.
+
+    The result lists one entry per resolution, finest first, under `resolutions`:
+    its `name`, bucket `width` in milliseconds, and the `start` (epoch milliseconds)
+    and `count` of each non-empty bucket. Resolutions with more than `max_buckets`
+    buckets are left out, except for the coarsest.
+
+    Args:
+        tree: The tree whose histograms to encode
+        max_buckets: Largest number of buckets to send per resolution
+
+    Returns:
+        dict: JSON-compatible histograms
+    """
+    resolutions = []
+    names = list(ProcessTree.HISTOGRAM_RESOLUTIONS)
+    for name in names:
+        histogram = tree.time_histogram(name)
+        if len(histogram) > max_buckets and name != names[-1]:
+            continue
+        resolutions.append(
+            {
+                "name": name,
+                "width": ProcessTree.HISTOGRAM_RESOLUTIONS[name] // 10**6,
+                "start": [_to_ns(start) // 10**6 for start, _ in histogram],
+                "count": [count for _, count in histogram],
+            }
+        )
+    return {"resolutions": resolutions}
+
+
+def _is_numeric(data_type: Any) -> bool:
+    import pyarrow.types as types
+
+    return bool(types.is_integer(data_type) or types.is_floating(data_type))
+
+
+def split_buffers(payload: Dict[str, Any]) -> Tuple[Dict[str, Any], List[memoryview]]:
+    """
+    Separates the binary buffers of an `encode_columns` payload for use with a custom
+    message. The returned metadata lists the buffer names under `buffers`, in order.
+    """
+    names = [name for name, value in payload.items() if isinstance(value, memoryview)]
+    content = {
+        name: value
+        for name, value in payload.items()
+        if not isinstance(value, memoryview)
+    }
+    content["buffers"] = names
+    return content, [payload[name] for name in names]
+
+
+__all__ = [
+    "MAX_HISTOGRAM_BUCKETS",
+    "encode_columns",
+    "encode_histograms",
+    "split_buffers",
+]
@@ -3,8 +3,14 @@ import ibis
 from datetime import datetime
 from ibis import _
 
+# Backends whose SQL has `WITH RECURSIVE`, for the depths in `prepare_process_graph`.
+# Spark (and Databricks before Runtime 17) don't.
+RECURSIVE_CTE_BACKENDS: frozenset[str] = frozenset(
+    {"duckdb", "mysql", "postgres", "snowflake", "sqlite", "trino"}
+)
 
-def prepare_events(events, source: str):
+
+def prepare_events(events, source: str, image_column: str | None = None):
     """Prepare events from different telemetry sources into a unified schema.
 
     Parameters
@@ -13,6 +19,9 @@ def prepare_events(events, source: str):
         The raw events table.
     source : str
         One of "mde" or "volatility".
+    image_column : str, optional
+        For Volatility events from several memory images, the column naming the
+        image of each row. See `prepare_volatility_data`.
 
     Returns
     -------
@@ -23,7 +32,7 @@ def prepare_events(events, source: str):
     if source_key == "mde":
         return prepare_mde_data(events)
     if source_key == "volatility":
-        return prepare_volatility_data(events)
+        return prepare_volatility_data(events, image_column)
     raise ValueError(f"Unknown source '{source}'. Expected 'mde' or 'volatility'.")
 
 
@@ -50,10 +59,17 @@ def prepare_mde_data(_events):
     )
 
 
-def prepare_volatility_data(_events):
+def prepare_volatility_data(_events, image_column: str | None = None):
     """
     Process Volatility data events from the `pstree` plugin. Focus on adding immediate parent and grandparent information.
+
+    `_vol_id`s are only unique within one memory image. For the output of several
+    images, pass the column naming the image as `image_column` and parents are only
+    looked up within the same image. See `arrow.prepare_volatility_table` for an
+    Arrow version without the self-joins.
     """
+    # Columns a process and its parent have to agree on
+    scope = [image_column] if image_column else []
 
     # Add parent (Parent_) information
     parent = (
@@ -61,8 +77,10 @@ def prepare_volatility_data(_events):
             ParentProcessId=_.PID,
             ParentProcessFilename=_.ImageFileName,
             ParentProcessCreationTime=_.CreateTime,
-            ParentVolId=_._vol_id
+            ParentVolId=_._vol_id,
+            **{f"Parent{column}": _[column] for column in scope},
         ).select(
+            *(f"Parent{column}" for column in scope),
             _.ParentVolId,
             _.ParentProcessId,
             _.ParentProcessFilename,
@@ -77,8 +95,10 @@ def prepare_volatility_data(_events):
             ActingProcessFilename=_.ImageFileName,
             ActingProcessCreationTime=_.CreateTime,
             ActingVolId=_._vol_id,
-            ActingVolParentId=_._vol_parent_id  # Added for correct join
+            ActingVolParentId=_._vol_parent_id,  # Added for correct join
+            **{f"Acting{column}": _[column] for column in scope},
         ).select(
+            *(f"Acting{column}" for column in scope),
             _.ActingVolId,
             _.ActingVolParentId,
             _.ActingProcessId,
@@ -91,7 +111,8 @@ def prepare_volatility_data(_events):
     acting = (
         parent.join(
             acting,
-            [acting.ActingVolParentId == parent.ParentVolId],
+            [acting.ActingVolParentId == parent.ParentVolId]
+            + [acting[f"Acting{column}"] == parent[f"Parent{column}"] for column in scope],
             how="right"
         )
     )
@@ -100,7 +121,8 @@ def prepare_volatility_data(_events):
     result = (
         _events.join(
             acting,
-            [_events._vol_parent_id == acting.ActingVolId],
+            [_events._vol_parent_id == acting.ActingVolId]
+            + [_events[column] == acting[f"Acting{column}"] for column in scope],
             how="left"
         )
         .mutate(
@@ -122,8 +144,175 @@ def prepare_volatility_data(_events):
 
     return result
 
+
+def _process_mentions(_events: ibis.Table) -> ibis.Table:
+    """
+    Unpack each event into the three processes it mentions, in the order
+    `ProcessTree.insert_process` visits them: parent, acting, target.
+
+    `Seq` orders the mentions like the Python insertion does. A mention is
+    `Strong` when it names the process's own parent, which is when the Python
+    tree updates the filename and moves the node; otherwise `ParentId` is null
+    and the process hangs off the root until a strong mention is seen.
+    """
+    rows = _events.mutate(
+        _Row=ibis.row_number().over(order_by=[_.Timestamp]),
+        ParentProcessId=ibis.coalesce(_.ParentProcessId, -1),
+        ActingProcessId=ibis.coalesce(_.ActingProcessId, -1),
+    )
+    no_parent = ibis.null().cast("int64")
+    no_time = ibis.null().cast(rows.TargetProcessCreationTime.type())
+
+    def mention(
+        pid: ibis.Value,
+        filename: ibis.Value,
+        creation_time: ibis.Value,
+        parent_id: ibis.Value,
+        parent_time: ibis.Value,
+        offset: int,
+    ) -> ibis.Table:
+        has_parent = parent_id != -1
+        return rows.select(
+            ProcessId=pid.cast("int64"),
+            ProcessFilename=filename,
+            ProcessCreationTime=creation_time.cast(no_time.type()),
+            ParentId=ibis.ifelse(has_parent, parent_id.cast("int64"), no_parent),
+            ParentCreationTime=ibis.ifelse(
+                has_parent, parent_time.cast(no_time.type()), no_time
+            ),
+            Strong=has_parent,
+            Seq=_._Row * 3 + offset,
+        )
+
+    parent = mention(
+        _.ParentProcessId,
+        _.ParentProcessFilename,
+        _.ParentProcessCreationTime,
+        ibis.literal(-1),
+        no_time,
+        0,
+    ).filter(_.ProcessId != -1)
+    acting = mention(
+        _.ActingProcessId,
+        _.ActingProcessFilename,
+        _.ActingProcessCreationTime,
+        _.ParentProcessId,
+        _.ParentProcessCreationTime,
+        1,
+    ).filter(_.ProcessId != -1)
+    target = mention(
+        _.TargetProcessId,
+        _.TargetProcessFilename,
+        _.TargetProcessCreationTime,
+        _.ActingProcessId,
+        _.ActingProcessCreationTime,
+        2,
+    )
+    return parent.union(acting).union(target)
+
+
+def prepare_process_graph(
+    events: ibis.Table, source: str
+) -> tuple[ibis.Table, ibis.Table]:
+    """Resolve process identity and ancestry in the query engine.
+
+    Builds on the `prepare_events` expression, so the de-duplication and parent
+    resolution run in the backend (DuckDB, Databricks, ...) and only one row per
+    process is returned, instead of one row per event with three process triplets.
+    The depths need a recursive CTE and are only computed on the backends in
+    `RECURSIVE_CTE_BACKENDS`; elsewhere `ProcessTree.from_nodes` checks the
+    parents for cycles in Python instead. The result matches what `ProcessTree.build_tree`
+    produces from the same events: a node keeps the filename and parent of its
+    last event that names its parent.
+
+    Parameters
+    ----------
+    events : ibis.Table
+        The raw events table.
+    source : str
+        One of "mde" or "volatility".
+
+    Returns
+    -------
+    tuple[ibis.Table, ibis.Table]
+        The node table, ordered by `NodeIndex` (1-based, 0 is the `<root>`
+        placeholder), with `ProcessId`, `ProcessFilename`,
+        `ProcessCreationTime`, `ParentIndex` (0 for top-level processes) and,
+        on the backends in `RECURSIVE_CTE_BACKENDS`, `Depth` (1 for top-level
+        processes), and the edge table with `ParentIndex` and `NodeIndex`. See
+        `ProcessTree.from_nodes`.
+    """
+    mentions = _process_mentions(prepare_events(events, source))
+    key = ["ProcessId", "ProcessCreationTime"]
+
+    first = mentions.group_by(key).aggregate(
+        FirstSeq=_.Seq.min(),
+        FirstFilename=_.ProcessFilename.argmin(_.Seq),
+    )
+    last = (
+        mentions.filter(_.Strong)
+        .group_by(key)
+        .aggregate(
+            LastFilename=_.ProcessFilename.argmax(_.Seq),
+            ParentId=_.ParentId.argmax(_.Seq),
+            ParentCreationTime=_.ParentCreationTime.argmax(_.Seq),
+        )
+    )
+
+    nodes = (
+        first.left_join(last, key)
+        .select(
+            *key,
+            ProcessFilename=ibis.coalesce(_.LastFilename, _.FirstFilename),
+            ParentId=_.ParentId,
+            ParentCreationTime=_.ParentCreationTime,
+            NodeIndex=ibis.row_number().over(order_by=_.FirstSeq) + 1,
+        )
+    )
+    # A self-join, which needs a view of the table
+    parents = nodes.view().select(
+        ParentId=_.ProcessId,
+        ParentCreationTime=_.ProcessCreationTime,
+        ParentIndex=_.NodeIndex,
+    )
+    nodes = nodes.left_join(parents, ["ParentId", "ParentCreationTime"]).select(
+        "NodeIndex",
+        *key,
+        "ProcessFilename",
+        ParentIndex=ibis.coalesce(_.ParentIndex, 0),
+    )
+    edges = nodes.select(_.ParentIndex, _.NodeIndex)
+    if ibis.get_backend(nodes).name not in RECURSIVE_CTE_BACKENDS:
+        return nodes.order_by(_.NodeIndex), edges
+
+    # Depth is a walk up the parent chain, done with a recursive CTE. Nodes on a
+    # parent cycle are never reached from the root and get a null depth.
+    nodes = nodes.alias("process_nodes").sql(
+        """
+        SELECT * FROM (
+            WITH RECURSIVE depths AS (
+                SELECT NodeIndex, 1 AS Depth
+                FROM process_nodes
+                WHERE ParentIndex = 0
+                UNION ALL
+                SELECT child.NodeIndex, depths.Depth + 1
+                FROM process_nodes AS child
+                JOIN depths ON child.ParentIndex = depths.NodeIndex
+            )
+            SELECT process_nodes.*, depths.Depth
+            FROM process_nodes
+            LEFT JOIN depths ON process_nodes.NodeIndex = depths.NodeIndex
+        )
+        """
+    ).order_by(_.NodeIndex)
+
+    return nodes, edges
+
+
 __all__ = [
+    "RECURSIVE_CTE_BACKENDS",
     "prepare_events",
     "prepare_mde_data",
+    "prepare_process_graph",
     "prepare_volatility_data",
 ]
\ No newline at end of file